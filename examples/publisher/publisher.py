@@ -14,33 +14,25 @@ from livekit_signaling.utils import PeerConnectionEvents, create_pc, wintolin
 
 logger = logging.getLogger("livekit-publisher")
 
-from aiortc.rtcdatachannel import logger as chan_logger
-from aiortc.rtcdtlstransport import logger as dtls_logger
-from aiortc.rtcicetransport import logger as ice_logger
-from aiortc.rtcpeerconnection import logger as pc_logger
-from aiortc.rtcrtpreceiver import logger as rtp_receiver_logger
-from aiortc.rtcrtpsender import logger as rtp_sender_logger
-from aiortc.rtcrtptransceiver import logger as rtp_logger
-from aiortc.rtcsctptransport import logger as sctp_logger
-
-loggers = {
-    "chan": chan_logger,
-    "dtls": dtls_logger,
-    "ice": ice_logger,
-    "pc": pc_logger,
-    "rtp": rtp_logger,
-    "rtp.receiver": rtp_receiver_logger,
-    "rtp.sender": rtp_sender_logger,
-    "sctp": sctp_logger,
-    "sig": logging.getLogger("livekit-signaling"),
-    "app": logging.getLogger("livekit-publisher"),
-    "sub": logging.getLogger("livekit-publisher-sub"),
-    "pub": logging.getLogger("livekit-publisher-pub"),
-    "rec": logging.getLogger("livekit-recorder"),
+# logger names, resolved with logging.getLogger only when requested
+_LOG_NAMES = {
+    "chan": "aiortc.rtcdatachannel",
+    "dtls": "aiortc.rtcdtlstransport",
+    "ice": "aiortc.rtcicetransport",
+    "pc": "aiortc.rtcpeerconnection",
+    "rtp": "aiortc.rtcrtptransceiver",
+    "rtp.receiver": "aiortc.rtcrtpreceiver",
+    "rtp.sender": "aiortc.rtcrtpsender",
+    "sctp": "aiortc.rtcsctptransport",
+    "sig": "livekit-signaling",
+    "app": "livekit-publisher",
+    "sub": "livekit-publisher-sub",
+    "pub": "livekit-publisher-pub",
+    "rec": "livekit-recorder",
 }
 
 
-async def run(player: VideoPlayer, signaling: Signaling) -> None:
+async def run(player: VideoPlayer, signaling: Signaling, sdk: str = "go") -> None:
     sub_logger = logging.getLogger("livekit-publisher-sub")
     sub_events = PeerConnectionEvents(sub_logger)
     sub = create_pc(events=sub_events)
@@ -68,14 +60,14 @@ async def run(player: VideoPlayer, signaling: Signaling) -> None:
             await sub.setLocalDescription(ans)
         except:
             logger.exception(
-                f"ERROR: Cannot set local description with answer:\n{wintolin(ans.sdp)}"
+                "ERROR: Cannot set local description with answer:\n%s",
+                wintolin(ans.sdp),
             )
             return False
 
-        local_desc = sub.localDescription
-
-        logger.debug(f"Sending ANSWER:\n{wintolin(local_desc.sdp)}")
-        await signaling.send_answer(local_desc)
+        # localDescription rebuilds the SDP on each access, and
+        # Signaling.send_answer already logs it
+        await signaling.send_answer(sub.localDescription)
 
         return True
 
@@ -92,7 +84,8 @@ async def run(player: VideoPlayer, signaling: Signaling) -> None:
             await pub.setLocalDescription(offer)
         except Exception as e:
             logger.exception(
-                f"ERROR: Cannot set local description with offer:\n{wintolin(offer.sdp)}"
+                "ERROR: Cannot set local description with offer:\n%s",
+                wintolin(offer.sdp),
             )
             return False
 
@@ -101,13 +94,14 @@ async def run(player: VideoPlayer, signaling: Signaling) -> None:
 
         return True
 
-    @signaling.on_recv("join")  # type: ignore
-    async def on_join(join: LK.JoinResponse) -> None:
+    @signaling.register("join")  # type: ignore
+    def on_join(join: LK.JoinResponse) -> None:
         logger.debug(f"Received join")
 
-    @signaling.on_recv("offer")  # type: ignore
+    @signaling.register("offer")  # type: ignore
     async def on_offer(offer: RTCSessionDescription) -> None:
-        logger.debug(f"Received OFFER:\n{wintolin(offer.sdp)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received OFFER:\n%s", wintolin(offer.sdp))
         await sub.setRemoteDescription(offer)
         await send_answer()
 
@@ -121,32 +115,31 @@ async def run(player: VideoPlayer, signaling: Signaling) -> None:
     ) -> None:
         await send_offer()
 
-    @signaling.on_recv("answer")  # type: ignore
+    @signaling.register("answer")  # type: ignore
     async def on_answer(answer: RTCSessionDescription) -> None:
-        logger.debug(f"PLAYER: RECEIVED ANSWER:\n{wintolin(answer.sdp)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("PLAYER: RECEIVED ANSWER:\n%s", wintolin(answer.sdp))
         await pub.setRemoteDescription(answer)
 
-    @signaling.on_recv("track_published")  # type: ignore
-    async def on_track_published(track: LK.TrackPublishedResponse) -> None:
+    @signaling.register("track_published")  # type: ignore
+    def on_track_published(track: LK.TrackPublishedResponse) -> None:
         logger.debug("PLAYER: Track published")
         logger.debug(track)
 
-    @signaling.on_recv("trickle")  # type: ignore
+    @signaling.register("trickle")  # type: ignore
     async def on_trickle(trickle: LK.TrickleRequest) -> None:
-        logger.debug(f"Trickle: add publisher candidate with {trickle.target}")
+        logger.debug("Trickle: add publisher candidate with %s", trickle.target)
         logger.debug(trickle)
         await sub.addIceCandidate(trickle.candidate)
 
     @signaling.on_sent("offer")  # type: ignore
     async def on_send_offer(offer: RTCSessionDescription) -> None:
-        logger.debug(f"Sent OFFER:\n{wintolin(offer.sdp)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sent OFFER:\n%s", wintolin(offer.sdp))
         await add_tracks()
 
-    @signaling.on_recv("all_messages")  # type: ignore
-    async def on_all_messages(event: str, message: LK.LKBase) -> None:
-        handled = ["offer", "answer", "trickle", "track_published"]
-        if event in handled:
-            return
+    @signaling.on_recv("unhandled_messages")  # type: ignore
+    def on_unhandled_messages(event: str, message: LK.LKBase) -> None:
         logger.debug(f"Received message from livekit:{type(message)}")
         logger.debug(message)
 
@@ -160,12 +153,14 @@ async def run(player: VideoPlayer, signaling: Signaling) -> None:
         logger.debug("PLAYER: ended")
 
     # connect and run signaling
-    await signaling.run(sdk="go")
+    await signaling.run(sdk=sdk)
 
 
-async def run_wrapper(player: VideoPlayer, signaling: Signaling) -> None:
+async def run_wrapper(
+    player: VideoPlayer, signaling: Signaling, sdk: str = "go"
+) -> None:
     try:
-        await run(player, signaling)
+        await run(player, signaling, sdk)
     finally:
         logger.error(f"Exiting")
         # await player.stop()
@@ -195,6 +190,12 @@ if __name__ == "__main__":
     )
     parser.add_argument("--room", "-r", help="Livekit room name", default=room)
     parser.add_argument("--identity", "-i", help="Livekit identity", default=identity)
+    parser.add_argument(
+        "--sdk",
+        help="SDK to announce to the Livekit server",
+        choices=["go", "js"],
+        default="go",
+    )
     parser.add_argument("--log", "-l", action="append", help="Log DEBUG module")
     parser.add_argument(
         "--list-log-modules", "-L", action="count", help="List module names"
@@ -202,7 +203,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     if args.list_log_modules:
-        print("-l " + " -l ".join(loggers.keys()))
+        print("-l " + " -l ".join(_LOG_NAMES.keys()))
         sys.exit(0)
 
     if not args.file:
@@ -224,17 +225,27 @@ if __name__ == "__main__":
 
     if args.log:
         for m in args.log:
-            loggers[m].addHandler(ch)
-            loggers[m].setLevel(logging.DEBUG)
+            module_logger = logging.getLogger(_LOG_NAMES[m])
+            module_logger.addHandler(ch)
+            module_logger.setLevel(logging.DEBUG)
 
     logger.info(f"Reading from file: {args.file}")
     player = VideoPlayer(args.file, loop=True)
 
+    try:
+        import uvloop  # type: ignore
+
+        uvloop.install()
+        logger.debug("Using uvloop event loop")
+    except ImportError:
+        pass
+
     try:
         result: Any = asyncio.run(
             run_wrapper(
                 player=player,
                 signaling=signaling,
+                sdk=args.sdk,
             )
         )
     except KeyboardInterrupt:
@@ -1,8 +1,15 @@
 import asyncio
+import functools
 import logging
 import os
-from dataclasses import dataclass
-from typing import Dict, List
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import Deque, Dict, List, Optional, Tuple
 
 import av  # type: ignore
 from aiortc import MediaStreamTrack
@@ -16,16 +23,82 @@ from livekit_signaling.utils import get_track_ids
 
 logger = logging.getLogger("livekit-recorder")
 
+# hardware H.264 encoders, tried in order before falling back to libx264
+HW_VIDEO_CODECS: Dict[str, List[str]] = {
+    "darwin": ["h264_videotoolbox"],
+    "linux": ["h264_nvenc", "h264_qsv", "h264_v4l2m2m"],
+    "win32": ["h264_nvenc", "h264_qsv"],
+}
+SW_VIDEO_CODEC = "libx264"
+# environment variable forcing the video encoder, e.g. libx264 in tests
+VIDEO_CODEC_ENV = "LIVEKIT_RECORDER_CODEC"
+
+VIDEO_CODEC_PIX_FMT: Dict[str, str] = {
+    "h264_nvenc": "nv12",
+    "h264_qsv": "nv12",
+    "h264_v4l2m2m": "nv12",
+}
+VIDEO_CODEC_OPTIONS: Dict[str, Dict[str, str]] = {
+    "h264_nvenc": {"preset": "p1", "tune": "ll", "zerolatency": "1"},
+    "libx264": {"preset": "veryfast", "tune": "zerolatency", "crf": "23"},
+}
+
+
+@functools.lru_cache(maxsize=None)
+def select_video_codec() -> str:
+    """
+    Return the name of the best available H.264 encoder.
+
+    Each hardware encoder is probed by opening a small codec context with the
+    options the recording uses, since libav may be built with encoders the host
+    has no device for, or an ffmpeg whose encoder rejects these options. The
+    LIVEKIT_RECORDER_CODEC environment variable bypasses the probing.
+    """
+    forced = os.environ.get(VIDEO_CODEC_ENV)
+    if forced:
+        logger.debug(f"Using video encoder {forced} from {VIDEO_CODEC_ENV}")
+        return forced
 
-@dataclass
+    for name in HW_VIDEO_CODECS.get(sys.platform, []):
+        try:
+            codec = av.CodecContext.create(name, "w")
+            codec.width = 640
+            codec.height = 480
+            codec.pix_fmt = VIDEO_CODEC_PIX_FMT.get(name, "yuv420p")
+            codec.time_base = Fraction(1, 30)
+            codec.options = VIDEO_CODEC_OPTIONS.get(name, {})
+            codec.open()
+        except Exception:
+            logger.debug(f"Video encoder {name} is not available")
+            continue
+        logger.debug(f"Using hardware video encoder {name}")
+        return name
+    return SW_VIDEO_CODEC
+
+
+@dataclass(slots=True)
 class StreamContext:
     track: MediaStreamTrack
     context: MediaRecorderContext
     container: av.container.OutputContainer
-    can_start: bool = False
+    track_id: LK.TrackId
+    pax_id: LK.ParticipantId
+    # set by start_recording, frames are not pulled (nor decoded) before
+    start_event: asyncio.Event = field(default_factory=asyncio.Event)
+    # received frames waiting for the encoder, the oldest ones are dropped
+    # if the encoder lags behind
+    frames: Deque[VideoFrame] = field(default_factory=lambda: deque(maxlen=1))
+    # frames dropped because the encoder lagged behind
+    dropped: int = 0
+    # True while the record waits in the encoder's ready queue
+    queued: bool = False
+    stopping: bool = False
+    # serializes the encoder threads on the (non thread-safe) container
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # resolved by the encoder thread once the container is closed
+    closed: Future[None] = field(default_factory=Future)
 
 
-@dataclass
 class FrameRecorder(AsyncIOEventEmitter):
     """
     A media sink that writes audio and/or video to series of files.
@@ -42,19 +115,40 @@ class FrameRecorder(AsyncIOEventEmitter):
 
     :param path: The path to a file, or a file-like object.
     :param options: Additional options to pass to FFmpeg.
+    :param record_frames: Write each frame to a PNG file instead of an mp4 video.
+    :param frames_in_flight: Frames of a track buffered for the encoder.
+    :param encoder_threads: Number of encoder threads, defaults to the CPU count
+        capped at 4.
     """
 
-    tracks: Dict[LK.TrackId, StreamContext]
-
     track_added = "track_added"
     track_removed = "track_removed"
     recorder_stopped = "recorder_stopped"
 
-    def __init__(self, path: str, record_frames: bool = True) -> None:
+    def __init__(
+        self,
+        path: str,
+        record_frames: bool = False,
+        frames_in_flight: int = 1,
+        encoder_threads: Optional[int] = None,
+    ) -> None:
         super().__init__()
         self.path = path
-        self.tracks = {}
+        self.tracks: Dict[LK.TrackId, StreamContext] = {}
         self.record_frames = record_frames
+        self.frames_in_flight = frames_in_flight
+        # libav encoders run their own threads, a few workers keep them busy
+        self.encoder_threads = encoder_threads or min(4, os.cpu_count() or 1)
+        os.makedirs(path, exist_ok=True)
+        self._created_dirs: set[str] = {path}
+        # records with pending frames, consumed by the encoder threads
+        self._ready: queue.SimpleQueue[Optional[StreamContext]] = queue.SimpleQueue()
+        self._encoders: List[threading.Thread] = []
+        # tracks whose output is being opened by addTrack, to the token of that
+        # addTrack call, dropped by disconnect_track and stop to abort it
+        self._opening: Dict[LK.TrackId, object] = {}
+        # tracks started before addTrack was done with them
+        self._start_requested: set[LK.TrackId] = set()
 
     async def addTrack(self, track: MediaStreamTrack) -> None:
         """
@@ -68,7 +162,9 @@ class FrameRecorder(AsyncIOEventEmitter):
 
         _pax_id, _track_id = get_track_ids(track)
 
-        print(f"NEW TRACK: track.id={track.id}, track.kind={track.kind}, pax_id={_pax_id}, track_id={_track_id}")
+        logger.debug(
+            f"New track: track.id={track.id}, track.kind={track.kind}, pax_id={_pax_id}, track_id={_track_id}"
+        )
 
         if _pax_id is None or _track_id is None:
             raise MediaStreamError("Track must have paxid and trid")
@@ -76,46 +172,44 @@ class FrameRecorder(AsyncIOEventEmitter):
         track_id = LK.TrackId(_track_id)
         pax_id = LK.ParticipantId(_pax_id)
 
-        track.trid = track_id
-        track.paxid = track_id
-        if self.tracks.get(track_id):
+        if self.tracks.get(track_id) or track_id in self._opening:
             logger.debug(f"Track {pax_id} {track_id} already being recorded")
             return
 
+        token = object()
+        self._opening[track_id] = token
         try:
-            path = f"{self.path}/track-{track_id}"
-            try:
-                os.mkdir(self.path)
-            except FileExistsError:
-                pass
-            if self.record_frames:
-                try:
-                    os.mkdir(path)
-                except FileExistsError:
-                    pass
-                file = f"{path}/frame-%d.png"
-            else:
-                file = f"{path}_video.mp4"
-
-            logger.debug(f"Recording track {track_id} to {file}")
-
-            options: Dict[str, object] = {}
-
-            container = av.open(file=file, format=None, mode="w", options=options)
-
-            if container.format.name == "image2":
-                stream = container.add_stream("png", rate=30)
-                stream.pix_fmt = "rgb24"
-            else:
-                stream = container.add_stream("libx264", rate=60)
-                stream.pix_fmt = "yuv420p"
+            # opening the output touches the disk and may probe encoders
+            loop = asyncio.get_running_loop()
+            container, stream = await loop.run_in_executor(
+                None, self._open_output, track_id
+            )
+            if self._opening.get(track_id) is not token:
+                logger.debug(f"Track {pax_id} {track_id} removed while opening")
+                container.close()
+                return
 
             context = MediaRecorderContext(stream)
-            record = StreamContext(track=track, context=context, container=container)
-            self.tracks[track_id] = record
+            record = StreamContext(
+                track=track,
+                context=context,
+                container=container,
+                track_id=track_id,
+                pax_id=pax_id,
+                frames=deque(maxlen=self.frames_in_flight),
+            )
+
+            if track_id in self._start_requested:
+                self._start_requested.discard(track_id)
+                record.start_event.set()
 
             # start the recording
+            if not self._encoders:
+                self._start_encoders()
             record.context.task = asyncio.ensure_future(self.__run_track(record))
+            record.context.task.add_done_callback(
+                functools.partial(self._on_track_done, record)
+            )
 
             self.tracks[track_id] = record
             self.emit(self.track_added, track)
@@ -127,72 +221,201 @@ class FrameRecorder(AsyncIOEventEmitter):
             )
             await self.stop()
             raise
+        finally:
+            if self._opening.get(track_id) is token:
+                del self._opening[track_id]
+
+    def _open_output(
+        self, track_id: LK.TrackId
+    ) -> Tuple[av.container.OutputContainer, av.stream.Stream]:
+        path = f"{self.path}/track-{track_id}"
+        if self.record_frames:
+            self._makedirs(path)
+            file = f"{path}/frame-%d.png"
+        else:
+            file = f"{path}_video.mp4"
+
+        logger.debug(f"Recording track {track_id} to {file}")
+
+        options: Dict[str, object] = {}
+
+        container = av.open(file=file, format=None, mode="w", options=options)
+
+        if container.format.name == "image2":
+            stream = container.add_stream("png", rate=30)
+            stream.pix_fmt = "rgb24"
+        else:
+            codec = select_video_codec()
+            stream = container.add_stream(codec, rate=60)
+            stream.pix_fmt = VIDEO_CODEC_PIX_FMT.get(codec, "yuv420p")
+            stream.options = VIDEO_CODEC_OPTIONS.get(codec, {})
+        return container, stream
+
+    def _start_encoders(self) -> None:
+        for i in range(self.encoder_threads):
+            encoder = threading.Thread(
+                target=self.__encode_worker, name=f"frame-encoder-{i}", daemon=True
+            )
+            encoder.start()
+            self._encoders.append(encoder)
+
+    def _makedirs(self, path: str) -> None:
+        if path not in self._created_dirs:
+            os.makedirs(path, exist_ok=True)
+            self._created_dirs.add(path)
 
     def disconnect_track(self, track_id: LK.TrackId) -> None:
+        # abort a pending addTrack, and forget a start it was waiting for
+        self._opening.pop(track_id, None)
+        self._start_requested.discard(track_id)
         record = self.tracks.pop(track_id, None)
         if record:
             # don't stop the track, because it won't restart
             # record.track.stop()
-            if record.context.task is not None:
-                logger.debug(f"Stopping recording of track {track_id}")
-                record.context.task.cancel()
-                record.context.task = None
-                for packet in record.context.stream.encode(None):
-                    record.container.mux(packet)
-
-            if record.container:
-                record.container.close()
-                record.container = None
+            logger.debug(f"Stopping recording of track {track_id}")
+            self._teardown(record)
             self.emit(self.track_removed, track_id)
 
+    def _teardown(self, record: StreamContext) -> None:
+        if record.context.task is not None:
+            record.context.task.cancel()
+            record.context.task = None
+
+        # the encoder thread flushes and closes the container
+        record.stopping = True
+        self._ready.put(record)
+
     async def stop(self) -> None:
         """
         Stop recording.
         """
-        for track_id, record in self.tracks.items():
+        # snapshot, disconnect_track may run while we wait for the encoder
+        records = list(self.tracks.items())
+        self.tracks.clear()
+        self._opening.clear()
+        self._start_requested.clear()
+
+        tasks = [
+            record.context.task
+            for _, record in records
+            if record.context.task is not None
+        ]
+        for _, record in records:
             record.track.stop()
-            if record.context.task is not None:
-                record.context.task.cancel()
-                record.context.task = None
-                for packet in record.context.stream.encode(None):
-                    record.container.mux(packet)
-
-            if record.container:
-                record.container.close()
-                record.container = None
+            self._teardown(record)
+        # let the cancelled tasks exit before the containers are flushed
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # the encoder threads close the containers in parallel
+        await asyncio.gather(
+            *(asyncio.wrap_future(record.closed) for _, record in records)
+        )
+        for track_id, _ in records:
             self.emit(self.track_removed, track_id)
+
+        for _ in self._encoders:
+            self._ready.put(None)
+        self._encoders = []
         self.emit(self.recorder_stopped)
 
     async def __run_track(self, record: StreamContext) -> None:
-        while True:
-            try:
-                logger.debug(f"Waiting for frame")
-                frame = await record.track.recv()
-            except MediaStreamError as e:
-                logger.exception(f"Recorder track {record.track.trid} ended")
-                print(f"Recorder track {record.track.trid} ended {e}")
-                return
-            except Exception as e:
-                logger.exception(f"Recorder track {record.track.trid} ended")
-                print(f"Recorder track {record.track.trid} ended {e}")
-                return
-
-            print(f"Got frame")
-            if record.can_start is False:
-                continue
-
-            print(f"Recording track {record.track.trid} frame {frame}")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        # don't pull (and decode) frames until the stream is active
+        await record.start_event.wait()
+        recv = record.track.recv
+        frames = record.frames
+        push = frames.append
+        maxlen = frames.maxlen
+        put = self._ready.put
+        try:
+            frame = await recv()
+            # size the output on the first frame, before any encoder sees it
+            stream = record.context.stream
+            stream.width = frame.width
+            stream.height = frame.height
+            record.context.started = True
+
+            while True:
+                if debug:
+                    logger.debug(
+                        "Recording track %s frame %s", record.track_id, frame
+                    )
+
+                # hand the frame over to the encoders, dropping the oldest if full
+                if len(frames) == maxlen:
+                    record.dropped += 1
+                push(frame)
+                if not record.queued:
+                    record.queued = True
+                    put(record)
+
+                if debug:
+                    logger.debug("Waiting for frame")
+                frame = await recv()
+        except MediaStreamError as e:
+            # the normal end of a track, no traceback needed
+            logger.debug("Recorder track %s ended: %r", record.track_id, e)
+
+    @staticmethod
+    def _on_track_done(record: StreamContext, task: asyncio.Future[None]) -> None:
+        # any other failure of a recording task ends up here
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f"Recording of track {record.track_id} failed",
+                exc_info=task.exception(),
+            )
 
-            if not record.context.started:
-                # adjust the output size to match the first frame
-                if isinstance(frame, VideoFrame):
-                    record.context.stream.width = frame.width
-                    record.context.stream.height = frame.height
-                record.context.started = True
+    def __encode_worker(self) -> None:
+        """
+        Encode the frames of the recorded tracks, running in a worker thread.
 
-            for packet in record.context.stream.encode(frame):
-                record.container.mux(packet)
+        Several workers share the ready queue, so different tracks are encoded
+        in parallel, while the per-track lock keeps the frames of a track in
+        order. Only the last frames_in_flight frames of a track are kept, so a
+        slow encoder drops frames instead of accumulating latency.
+        """
+        get = self._ready.get
+        encode_and_mux = self._encode_and_mux
+        while True:
+            record = get()
+            if record is None:
+                return
+            with record.lock:
+                record.queued = False
+                if record.stopping:
+                    self._close(record)
+                    continue
+
+                frames = record.frames
+                while frames:
+                    encode_and_mux(record, frames.popleft())
+
+    @staticmethod
+    def _encode_and_mux(record: StreamContext, frame: Optional[VideoFrame]) -> None:
+        # mux() takes the whole list of packets and iterates it in Cython
+        record.container.mux(record.context.stream.encode(frame))
+
+    def _close(self, record: StreamContext) -> None:
+        if record.closed.done():
+            return
+        try:
+            if record.context.started:
+                self._encode_and_mux(record, None)
+            record.container.close()
+        except Exception:
+            logger.exception(f"Failed to close recording of track {record.track_id}")
+        finally:
+            record.closed.set_result(None)
+        if record.dropped:
+            logger.warning(
+                f"Dropped {record.dropped} frames of track {record.track_id}"
+            )
 
     def start_recording(self, track_id: LK.TrackId) -> None:
         logger.debug(f"Starting recording of track {track_id}")
-        self.tracks[track_id].can_start = True
+        record = self.tracks.get(track_id)
+        if record is None:
+            # addTrack is still opening the output, it will start the record
+            self._start_requested.add(track_id)
+            return
+        record.start_event.set()
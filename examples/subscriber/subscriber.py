@@ -4,48 +4,53 @@ import asyncio
 import logging
 import os
 import sys
-from typing import Any
+from typing import Any, Sequence
 
 from aiortc import MediaStreamTrack, sdp
 from recorder import FrameRecorder
 
 from livekit_signaling import LK, Signaling
-from livekit_signaling.utils import PeerConnectionEvents, create_pc, wintolin
+from livekit_signaling.utils import (
+    PeerConnectionEvents,
+    ReusableBlackhole,
+    create_pc,
+    wintolin,
+)
 
 logger = logging.getLogger("livekit-subscriber")
 
-from aiortc.rtcdatachannel import logger as chan_logger
-from aiortc.rtcdtlstransport import logger as dtls_logger
-from aiortc.rtcicetransport import logger as ice_logger
-from aiortc.rtcpeerconnection import logger as pc_logger
-from aiortc.rtcrtpreceiver import logger as rtp_receiver_logger
-from aiortc.rtcrtpsender import logger as rtp_sender_logger
-from aiortc.rtcrtptransceiver import logger as rtp_logger
-from aiortc.rtcsctptransport import logger as sctp_logger
-
-loggers = {
-    "chan": chan_logger,
-    "dtls": dtls_logger,
-    "ice": ice_logger,
-    "pc": pc_logger,
-    "rtp": rtp_logger,
-    "rtp.receiver": rtp_receiver_logger,
-    "rtp.sender": rtp_sender_logger,
-    "sctp": sctp_logger,
-    "sig": logging.getLogger("livekit-signaling"),
-    "app": logging.getLogger("livekit-subscriber"),
-    "sub": logging.getLogger("livekit-subscriber-sub"),
-    "pub": logging.getLogger("livekit-subscriber-pub"),
-    "rec": logging.getLogger("livekit-recorder"),
+sub_logger = logging.getLogger("livekit-subscriber-sub")
+pub_logger = logging.getLogger("livekit-subscriber-pub")
+
+# logger names, resolved with logging.getLogger only when requested
+_LOG_NAMES = {
+    "chan": "aiortc.rtcdatachannel",
+    "dtls": "aiortc.rtcdtlstransport",
+    "ice": "aiortc.rtcicetransport",
+    "pc": "aiortc.rtcpeerconnection",
+    "rtp": "aiortc.rtcrtptransceiver",
+    "rtp.receiver": "aiortc.rtcrtpreceiver",
+    "rtp.sender": "aiortc.rtcrtpsender",
+    "sctp": "aiortc.rtcsctptransport",
+    "sig": "livekit-signaling",
+    "app": "livekit-subscriber",
+    "sub": "livekit-subscriber-sub",
+    "pub": "livekit-subscriber-pub",
+    "rec": "livekit-recorder",
 }
 
+# the wrappers already hold LK enum members, which are singletons
+_AUDIO = LK.TrackType.AUDIO
+_DISCONNECTED = LK.ParticipantInfoState.DISCONNECTED
+_STREAM_ACTIVE = LK.StreamState.ACTIVE
 
-async def run(recorder: FrameRecorder, signaling: Signaling) -> None:
-    sub_logger = logging.getLogger("livekit-subscriber-sub")
+
+async def run(
+    recorder: FrameRecorder, blackhole: ReusableBlackhole, signaling: Signaling
+) -> None:
     sub_events = PeerConnectionEvents(sub_logger)
     sub = create_pc(events=sub_events)
 
-    pub_logger = logging.getLogger("livekit-subscriber-pub")
     pub_events = PeerConnectionEvents(pub_logger)
     pub = create_pc(events=pub_events)
 
@@ -60,82 +65,108 @@ async def run(recorder: FrameRecorder, signaling: Signaling) -> None:
     # DEBUG
     @channel.on("message")  # type: ignore
     def on_message(message: str) -> None:
-        logger.debug(f"Received message: {message}")
+        logger.debug("Received message: %s", message)
 
     # DEBUG
     @channel.on("close")  # type: ignore
     def on_close() -> None:
         logger.debug("Channel closed")
 
+    # keep a reference to the addTrack tasks until they are done
+    adding_tracks: set[asyncio.Task[None]] = set()
+
     @sub.on("track")  # type: ignore
     def on_track(track: MediaStreamTrack) -> None:
-        logger.warning(f"Receiving track {track.kind} {track.id}")
+        logger.warning("Receiving track %s %s", track.kind, track.id)
 
         if track.kind == "audio":
+            # audio is not recorded, but must be consumed to not pile up
+            blackhole.addTrack(track)
+
+            @track.on("ended")  # type: ignore
+            def on_audio_ended() -> None:
+                blackhole.releaseTrack(track)
+
             return
 
-        asyncio.ensure_future(recorder.addTrack(track))
+        task = asyncio.create_task(
+            recorder.addTrack(track), name=f"addTrack-{track.kind}-{track.id}"
+        )
+        adding_tracks.add(task)
+        task.add_done_callback(adding_tracks.discard)
 
         # DEBUG
         @track.on("ended")  # type: ignore
-        async def on_ended() -> None:
-            logger.debug(f"Track {track.trid} ended")
+        def on_ended() -> None:
+            logger.debug("Track %s ended", track.id)
 
     # DEBUG
     @recorder.on(FrameRecorder.recorder_stopped)  # type: ignore
-    async def on_recorder_stopped() -> None:
-        logger.debug(f"on_recorder_stopped")
+    def on_recorder_stopped() -> None:
+        logger.debug("on_recorder_stopped")
 
     # DEBUG
     @recorder.on(FrameRecorder.track_added)  # type: ignore
     def on_track_added(track: MediaStreamTrack) -> None:
-        logger.debug(f"on_track_added Adding track {track.trid}")
-        print(f"on_track_added Adding track {track.trid}")
+        logger.debug("on_track_added Adding track %s", track.id)
+        print(f"on_track_added Adding track {track.id}")
+
+    # tracks of a participant waiting to be unsubscribed together. Tracks ending
+    # on their own are removed one at a time, so in practice this only merges
+    # the removals FrameRecorder.stop() emits back to back at shutdown.
+    unsubscribing: dict[LK.ParticipantId, list[LK.TrackId]] = {}
 
     @recorder.on(FrameRecorder.track_removed)  # type: ignore
     async def on_track_removed(track_id: LK.TrackId) -> None:
-        # FIXME: this is messy
-        logger.debug(f"on_track_removed Removing track {track_id}")
-        paxtracks = signaling.paxtracker.get_lkParticipantTracks(track_id=track_id)
-        if not paxtracks:
-            logger.error(f"on_track_removed No participant track for {track_id}")
+        logger.debug("on_track_removed Removing track %s", track_id)
+        pax_id = signaling.paxtracker.tracks.get(track_id)
+        if pax_id is None:
+            # already unsubscribed, or never subscribed
+            logger.debug("on_track_removed No participant track for %s", track_id)
             return
+        signaling.paxtracker.remove_track(track_id)
 
-        tracks = paxtracks.track_sids
+        pending = unsubscribing.get(pax_id)
+        if pending is not None:
+            pending.append(track_id)
+            return
+        unsubscribing[pax_id] = pending = [track_id]
+        # let the other tracks removed in this loop iteration join the request
+        await asyncio.sleep(0)
+        del unsubscribing[pax_id]
 
+        paxtracks = LK.ParticipantTracks(participant_sid=pax_id, track_sids=pending)
         unsub = LK.UpdateSubscription(
-            track_sids=tracks, subscribe=False, participant_tracks=[paxtracks]
-        )
-        logger.debug(
-            f"on_track_removed Participant {paxtracks.participant_sid} {paxtracks.track_sids}"
+            track_sids=pending, subscribe=False, participant_tracks=[paxtracks]
         )
+        logger.debug("on_track_removed Participant %s %s", pax_id, pending)
 
         await signaling.send_unsubscription_request(unsub)
 
     # DEBUG
     @sub.on("connectionstatechange")  # type: ignore
-    async def on_connectionstatechange() -> None:
-        logger.debug(f"Connection state is {sub.connectionState}")
+    def on_connectionstatechange() -> None:
+        logger.debug("Connection state is %s", sub.connectionState)
 
     # DEBUG
     @sub.on("statechange")  # type: ignore
-    async def on_statechange() -> None:
-        logger.debug(f"State is {sub.iceConnectionState}")
+    def on_statechange() -> None:
+        logger.debug("State is %s", sub.iceConnectionState)
 
     # DEBUG
     @sub.on("iceconnectionstatechange")  # type: ignore
-    async def on_iceconnectionstatechange() -> None:
-        logger.debug(f"ICE connection state is {sub.iceConnectionState}")
+    def on_iceconnectionstatechange() -> None:
+        logger.debug("ICE connection state is %s", sub.iceConnectionState)
 
     # DEBUG
     @sub.on("icegatheringstatechange")  # type: ignore
-    async def on_icegatheringstatechange() -> None:
-        logger.debug(f"ICE gathering state is {sub.iceGatheringState}")
+    def on_icegatheringstatechange() -> None:
+        logger.debug("ICE gathering state is %s", sub.iceGatheringState)
 
     # DEBUG
     @sub.on("signalingstatechange")  # type: ignore
-    async def on_signalingstatechange() -> None:
-        logger.debug(f"Signaling state is {sub.signalingState}")
+    def on_signalingstatechange() -> None:
+        logger.debug("Signaling state is %s", sub.signalingState)
 
     async def send_answer() -> None:
         ans = await sub.createAnswer()
@@ -143,186 +174,138 @@ async def run(recorder: FrameRecorder, signaling: Signaling) -> None:
             await sub.setLocalDescription(ans)
         except:
             logger.exception(
-                f"ERROR: Cannot set local description with answer:\n{wintolin(ans.sdp)}"
+                "ERROR: Cannot set local description with answer:\n%s",
+                wintolin(ans.sdp),
             )
             return
 
-        local_desc = sub.localDescription
+        # localDescription rebuilds the SDP on each access, and
+        # Signaling.send_answer already logs it
+        await signaling.send_answer(sub.localDescription)
 
-        logger.debug(f"Sending ANSWER:\n{wintolin(local_desc.sdp)}")
-
-        await signaling.send_answer(local_desc)
-
-    @signaling.on_recv("join")  # type: ignore
-    async def on_join(join: LK.JoinResponse) -> None:
-        # FIXME: this is messy
-        logger.debug(f"Received join response: {join}")
+    async def process_participants(participants: Sequence[LK.ParticipantInfo]) -> None:
         subscriptions: dict[LK.ParticipantId, list[LK.TrackId]] = {}
-        layers: dict[
-            LK.ParticipantId,
-            dict[LK.TrackId, dict[str, dict[str, None | str | int | float]]],
-        ] = {}
-        tracks_added = 0
-        for participant in join.other_participants:
-            if participant.state.name == "DISCONNECTED":
+        # smallest layer of each subscribed video track
+        settings: list[tuple[LK.TrackId, int, int]] = []
+        # tracks already subscribed to, updates only send the new ones
+        subscribed = signaling.paxtracker.tracks
+        add_track = signaling.paxtracker.add_track
+        # checked once, the loops below run for every participant/track/layer
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for participant in participants:
+            pid = participant.sid
+            if participant.state is _DISCONNECTED:
+                for track in participant.tracks:
+                    if debug:
+                        logger.debug("Removing track %s", track.sid)
+                    recorder.disconnect_track(track.sid)
+                # the server dropped the subscriptions, don't unsubscribe
+                signaling.paxtracker.remove_participant(pid)
                 continue
-            logger.debug(f"Participant: {participant.identity} {participant.sid}")
-            subscriptions[participant.sid] = []
-            layers[participant.sid] = {}
+            if debug:
+                logger.debug("Participant: %s %s", participant.identity, pid)
+            sub_list: list[LK.TrackId] = []
             for track in participant.tracks:
-                layers[participant.sid][track.sid] = {}
-                logger.debug(f"Track: {track.type} {track.sid}")
-                if LK.TrackType(track.type) == LK.TrackType("audio"):
+                tid = track.sid
+                ttype = track.type
+                if debug:
+                    logger.debug("Track: %s %s", ttype, tid)
+                if ttype is _AUDIO or tid in subscribed:
                     continue
+                best: tuple[int, int] | None = None
+                best_area = 0
                 for layer in track.layers:
-                    layers[participant.sid][track.sid][layer.quality.name] = {
-                        "quality": layer.quality.name,
-                        "width": layer.width,
-                        "height": layer.height,
-                        "bitrate": layer.bitrate,
-                        "ssrc": layer.ssrc,
-                    }
-
-                    if layer.ssrc == 0:
+                    width = layer.width
+                    height = layer.height
+                    if layer.ssrc == 0 or width is None or height is None:
                         continue
-                    logger.debug(f"Layer: {layer.width} {layer.height} {layer.ssrc}")
-                logger.debug(f"Adding track {track.sid} to subscriber")
-                subscriptions[participant.sid].append(track.sid)
-                signaling.paxtracker.add_track(participant.sid, track.sid)
-                tracks_added += 1
-        if tracks_added > 0:
-            await signaling.send_subscription_request(subscriptions)
-
-            for pax_id, tracks in layers.items():
-                for track_id, track_layers in tracks.items():
-                    ssrc = None
-                    res = 10000**2
-                    for quality, track_layer in track_layers.items():
-                        if track_layer["ssrc"] == 0 or None in (
-                            track_layer["width"],
-                            track_layer["height"],
-                        ):
-                            continue
-
-                        width: int = int(track_layer["width"])  # type: ignore[arg-type]
-                        height: int = int(track_layer["height"])  # type: ignore[arg-type]
-
-                        if width * height < res:
-                            res = width * height
-                            ssrc = track_layer["ssrc"]
-                    await signaling.send_update_track_settings(
-                        track_id=track_id, width=width, height=height
-                    )
+                    if debug:
+                        logger.debug("Layer: %s %s %s", width, height, layer.ssrc)
+                    area = width * height
+                    if best is None or area < best_area:
+                        best = (width, height)
+                        best_area = area
+                if debug:
+                    logger.debug("Adding track %s to subscriber", tid)
+                sub_list.append(tid)
+                add_track(pid, tid)
+                if best is not None:
+                    settings.append((tid, *best))
+            if sub_list:
+                subscriptions[pid] = sub_list
+
+        if not subscriptions:
+            return
+        # the server must see the subscription before the settings
+        if not await signaling.send_subscription_request(subscriptions):
+            # not subscribed, let the next update retry these tracks
+            logger.warning("Failed to send the subscription request")
+            for track_ids in subscriptions.values():
+                for tid in track_ids:
+                    signaling.paxtracker.remove_track(tid)
+            return
+        if settings:
+            await signaling.send_update_track_settings_batch(settings)
+
+    @signaling.on_recv("join")  # type: ignore
+    async def on_join(join: LK.JoinResponse) -> None:
+        logger.debug("Received join response: %s", join)
+        # new session, nothing is subscribed yet
+        paxtracker = signaling.paxtracker
+        for pid in list(paxtracker.participants):
+            paxtracker.remove_participant(pid)
+        await process_participants(join.other_participants)
 
     @signaling.on_recv("offer")  # type: ignore
     async def on_offer(offer: LK.SessionDescription) -> None:
-        logger.debug(f"Received OFFER:\n{wintolin(offer.sdp)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received OFFER:\n%s", wintolin(offer.sdp))
         await sub.setRemoteDescription(offer.to_aiortc())
-        desc = sdp.SessionDescription.parse(sub.remoteDescription.sdp)
-        for media in desc.media:
-            for ssrc in media.ssrc:
-                logger.debug(f"Media: {media.kind} {ssrc.ssrc} {ssrc.label}")
+        if logger.isEnabledFor(logging.DEBUG):
+            # only parsed to log the SSRCs
+            desc = sdp.SessionDescription.parse(sub.remoteDescription.sdp)
+            for media in desc.media:
+                for ssrc in media.ssrc:
+                    logger.debug("Media: %s %s %s", media.kind, ssrc.ssrc, ssrc.label)
         await send_answer()
 
     @signaling.on_recv("trickle")  # type: ignore
     async def on_trickle(trickle: LK.TrickleRequest) -> None:
-        logger.debug(f"Trickle: add subscriber candidate with {trickle.target}")
+        logger.debug("Trickle: add subscriber candidate with %s", trickle.target)
         logger.debug(trickle)
         await sub.addIceCandidate(trickle.candidate)
 
     @signaling.on_recv("update")  # type: ignore
     async def on_participant_update(update: LK.ParticipantUpdate) -> None:
-        # FIXME: this is messy
-        logger.debug(f"Received update: {update}")
-        subscriptions: dict[LK.ParticipantId, list[LK.TrackId]] = {}
-        layers: dict[
-            LK.ParticipantId,
-            dict[LK.TrackId, dict[str, dict[str, None | str | int | float]]],
-        ] = {}
-        tracks_added = 0
-        for participant in update.participants:
-            if participant.state.name == "DISCONNECTED":
-                for track in participant.tracks:
-                    logger.debug(f"Removing track {track.sid}")
-                    recorder.disconnect_track(track.sid)
-                continue
-            logger.debug(f"Participant: {participant.identity} {participant.sid}")
-            subscriptions[participant.sid] = []
-            layers[participant.sid] = {}
-            for track in participant.tracks:
-                layers[participant.sid][track.sid] = {}
-                logger.debug(f"Track: {track.type} {track.sid}")
-                if LK.TrackType(track.type) == LK.TrackType("audio"):
-                    continue
-                for layer in track.layers:
-                    layers[participant.sid][track.sid][layer.quality.name] = {
-                        "quality": layer.quality.name,
-                        "width": layer.width,
-                        "height": layer.height,
-                        "bitrate": layer.bitrate,
-                        "ssrc": layer.ssrc,
-                    }
-
-                    if layer.ssrc == 0:
-                        continue
-                    logger.debug(f"Layer: {layer.width} {layer.height} {layer.ssrc}")
-                logger.debug(f"Adding track {track.sid} to subscriber")
-                subscriptions[participant.sid].append(track.sid)
-                signaling.paxtracker.add_track(participant.sid, track.sid)
-                tracks_added += 1
-        if tracks_added > 0:
-            await signaling.send_subscription_request(subscriptions)
-
-            for pax_id, tracks in layers.items():
-                for track_id, track_layers in tracks.items():
-                    ssrc = None
-                    res = 10000**2
-                    for quality, track_layer in track_layers.items():
-                        if track_layer["ssrc"] == 0 or None in (
-                            track_layer["width"],
-                            track_layer["height"],
-                        ):
-                            continue
-
-                        width: int = int(track_layer["width"])  # type: ignore[arg-type]
-                        height: int = int(track_layer["height"])  # type: ignore[arg-type]
-
-                        if width * height < res:
-                            res = width * height
-                            ssrc = track_layer["ssrc"]
-                    await signaling.send_update_track_settings(
-                        track_id=track_id, width=width, height=height
-                    )
+        logger.debug("Received update: %s", update)
+        await process_participants(update.participants)
 
     @signaling.on_recv("stream_state_update")  # type: ignore
-    async def on_stream_state_update(update: LK.StreamStateUpdate) -> None:
-        logger.debug(f"Received stream state update: {update}")
+    def on_stream_state_update(update: LK.StreamStateUpdate) -> None:
+        logger.debug("Received stream state update: %s", update)
         for state in update.stream_states:
-            if state.state.name == "ACTIVE":
+            if state.state is _STREAM_ACTIVE:
                 logger.debug(
-                    f"Stream {state.participant_sid} {state.track_sid} is active"
+                    "Stream %s %s is active", state.participant_sid, state.track_sid
                 )
                 # FIXME: this call still does nothing but should tell the recorder to start recording this track
                 recorder.start_recording(track_id=LK.TrackId(state.track_sid))
 
     # DEBUG
     @signaling.on_sent("subscription")  # type: ignore
-    async def on_subscription_request(subscription: object) -> None:
-        logger.debug(f"Sent subscription request: {subscription}")
+    def on_subscription_request(subscription: object) -> None:
+        logger.debug("Sent subscription request: %s", subscription)
 
     # DEBUG
     @signaling.on_sent("track_setting")  # type: ignore
-    async def on_track_setting_request(track_setting: object) -> None:
-        logger.debug(f"Sent track setting request: {track_setting}")
+    def on_track_setting_request(track_setting: object) -> None:
+        logger.debug("Sent track setting request: %s", track_setting)
 
     # DEBUG
-    @signaling.on_recv("all_messages")  # type: ignore
-    async def on_all_messages(event: str, message: LK.LKBase) -> None:
-        handled = ["join", "offer", "trickle", "update", "stream_state_update"]
-        if event in handled:
-            return
+    @signaling.on_recv("unhandled_messages")  # type: ignore
+    def on_unhandled_messages(event: str, message: LK.LKBase) -> None:
         logger.debug(
-            f"Received unhandled {event} message from livekit: {type(message)}"
+            "Received unhandled %s message from livekit: %s", event, type(message)
         )
         logger.debug(message)
 
@@ -331,18 +314,20 @@ async def run(recorder: FrameRecorder, signaling: Signaling) -> None:
     start_time = int(1000 * time.time())
 
     @signaling.on_recv("pong")  # type: ignore
-    async def on_pong(pong: LK.Pong) -> None:
-        logger.warning(f"Received pong: {(pong.time - start_time) / 1000} seconds")
+    def on_pong(pong: LK.Pong) -> None:
+        logger.warning("Received pong: %s seconds", (pong.time - start_time) / 1000)
 
     # Run the main loop
     await signaling.run(sdk="go")
 
 
 async def run_wrapper(recorder: FrameRecorder, signaling: Signaling) -> None:
+    blackhole = ReusableBlackhole()
     try:
-        await run(recorder, signaling)
+        await run(recorder, blackhole, signaling)
     finally:
         logger.error(f"Exiting")
+        await blackhole.stop()
         await recorder.stop()
         await signaling.close()
 
@@ -358,7 +343,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Video stream from the command line")
     parser.add_argument(
         "path",
-        help="Write video tracks to path/{id}/frame{number}.png",
+        help="Write video tracks to path/track-{id}_video.mp4 (or path/track-{id}/frame-{number}.png)",
         default=None,
         nargs="?",
     )
@@ -370,6 +355,13 @@ if __name__ == "__main__":
     )
     parser.add_argument("--room", "-r", help="Livekit room name", default=room)
     parser.add_argument("--identity", "-i", help="Livekit identity", default=identity)
+    parser.add_argument(
+        "--format",
+        "-f",
+        help="Recording format, png is meant for debugging",
+        choices=["mp4", "png"],
+        default="mp4",
+    )
     parser.add_argument("--log", "-l", action="append", help="Log DEBUG module")
     parser.add_argument(
         "--list-log-modules", "-L", action="count", help="List module names"
@@ -377,7 +369,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     if args.list_log_modules:
-        print("-l " + " -l ".join(loggers.keys()))
+        print("-l " + " -l ".join(_LOG_NAMES.keys()))
         sys.exit(0)
 
     if not args.path:
@@ -399,11 +391,20 @@ if __name__ == "__main__":
 
     if args.log:
         for m in args.log:
-            loggers[m].addHandler(ch)
-            loggers[m].setLevel(logging.DEBUG)
+            module_logger = logging.getLogger(_LOG_NAMES[m])
+            module_logger.addHandler(ch)
+            module_logger.setLevel(logging.DEBUG)
 
     logger.info(f"Writing to directory: {args.path}")
-    recorder = FrameRecorder(args.path)
+    recorder = FrameRecorder(args.path, record_frames=args.format == "png")
+
+    try:
+        import uvloop  # type: ignore
+
+        uvloop.install()
+        logger.debug("Using uvloop event loop")
+    except ImportError:
+        pass
 
     try:
         result: Any = asyncio.run(
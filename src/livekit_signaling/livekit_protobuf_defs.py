@@ -1,9 +1,35 @@
-# fix protobuf implementation
+# fix protobuf implementation: the livekit package ships modules generated by an
+# old protoc, which the native backends refuse to load. Only the default is
+# forced, set PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=upb to use the (much faster)
+# native parser with regenerated modules.
 import os
 
-os.environ["PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION"] = "python"
+os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "python")
 
-import livekit._proto.livekit_models_pb2 as lkmodels  # type: ignore
-import livekit._proto.livekit_rtc_pb2 as lkrtc  # type: ignore
+try:
+    import livekit._proto.livekit_models_pb2 as lkmodels  # type: ignore
+    import livekit._proto.livekit_rtc_pb2 as lkrtc  # type: ignore
+except ImportError:
+    # newer livekit packages expose the generated modules publicly
+    import livekit.proto.livekit_models_pb2 as lkmodels  # type: ignore
+    import livekit.proto.livekit_rtc_pb2 as lkrtc  # type: ignore
+from google.protobuf.internal import api_implementation  # type: ignore
 
-__all__ = ["lkmodels", "lkrtc"]
+# "python", "cpp" or "upb": every from_lk()/to_lk() field access goes through it
+protobuf_backend: str = api_implementation.Type()
+
+# parse the messages of the join path once at import, so that the backend's
+# lazy per-class setup is not paid when the first SignalResponse arrives
+for _message in (
+    lkrtc.SignalResponse,
+    lkrtc.JoinResponse,
+    lkrtc.SessionDescription,
+    lkrtc.TrickleRequest,
+    lkrtc.ParticipantUpdate,
+    lkmodels.ParticipantInfo,
+    lkmodels.TrackInfo,
+):
+    _message.FromString(b"")
+del _message
+
+__all__ = ["lkmodels", "lkrtc", "protobuf_backend"]
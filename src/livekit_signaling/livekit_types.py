@@ -1,16 +1,20 @@
 # Wrapper classes to avoid protobuf weirdness in client apps
+# The conversions read the protobuf messages field by field, they are much
+# faster with a native protobuf backend, see livekit_protobuf_defs.
 from __future__ import annotations
 
 import enum
 import sys
-from dataclasses import dataclass
-from typing import Any, List, NewType, Optional
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Any, NewType, Optional, Sequence, TypeVar
 
 import aiortc
-from aiortc import RTCIceCandidate
 
 from .livekit_protobuf_defs import lkmodels, lkrtc
-from .utils import aio_to_proto_candidate, proto_to_aio_candidate
+from .utils import aio_to_candidate_init, proto_to_aio_candidate
+
+if TYPE_CHECKING:
+    from aiortc import RTCIceCandidate
 
 LKAny = Any
 
@@ -19,57 +23,167 @@ Token = NewType("Token", str)
 ParticipantId = NewType("ParticipantId", str)
 TrackId = NewType("TrackId", str)
 
+# built for every sent message
+_SignalRequest = lkrtc.SignalRequest
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+# keys of the length delimited SignalRequest members, the scalar members (ping)
+# are left to the protobuf serializer
+_SIGNAL_REQUEST_KEYS: dict[str, bytes] = {
+    field.name: _varint(field.number << 3 | 2)
+    for field in _SignalRequest.DESCRIPTOR.fields
+    if field.message_type is not None
+}
+# the framing below only holds for singular members of the message oneof
+assert all(
+    field.containing_oneof is not None and field.label != field.LABEL_REPEATED
+    for field in _SignalRequest.DESCRIPTOR.fields
+), "SignalRequest members are expected to be singular oneof members"
+
+
+def _signal_request_bytes(msg: str, pb: LKAny) -> bytes:
+    key = _SIGNAL_REQUEST_KEYS.get(msg)
+    if key is None:
+        return _SignalRequest(**{msg: pb}).SerializeToString()  # type: ignore
+    # a SignalRequest holding a single message member serializes to that member
+    # framed as an embedded message, no need to build (and copy into) the wrapper
+    payload = pb.SerializeToString()
+    return key + _varint(len(payload)) + payload
+
+
+LKEnumT = TypeVar("LKEnumT", bound="LKEnum")
+
 
 class LKEnum(enum.Enum):
+    """
+    Base of the protobuf enum wrappers.
+
+    Subclasses register their protobuf values with _map_lk() once the class is
+    created, from_lk() is then a dict lookup and to_lk() reads the value stored
+    on the member.
+    """
+
+    _FROM_LK: dict[LKAny, LKEnum]
+    # None for the members with no protobuf counterpart
+    _lk_value: LKAny
+
     def __str__(self) -> str:
         return self.name
 
     @classmethod
-    def from_lk(cls, pb: LKAny) -> LKEnum:
-        raise NotImplementedError()
+    def _map_lk(cls, from_lk: dict[LKAny, LKEnum]) -> None:
+        cls._FROM_LK = from_lk
+        for member in cls:
+            member._lk_value = None
+        for pb, member in from_lk.items():
+            member._lk_value = pb
+
+    @classmethod
+    def from_lk(cls: type[LKEnumT], pb: LKAny) -> LKEnumT:
+        try:
+            return cls._FROM_LK[pb]  # type: ignore[return-value]
+        except KeyError:
+            raise ValueError(f"Unknown {cls.__name__}: {pb}") from None
 
     def to_lk(self) -> LKAny:
-        raise NotImplementedError()
+        value = self._lk_value
+        if value is None:
+            raise ValueError(f"Unknown {self.__class__.__name__}: {self}")
+        return value
 
 
-def ind(indent: int) -> str:
-    return f"{indent:2d}" + " " * indent
+# SignalResponse/SignalRequest oneof names to the LKBase class wrapping them,
+# filled by LKBase.__init_subclass__
+map_signal_response_to_class: dict[str, type[LKBase]] = {}
+map_signal_request_to_class: dict[str, type[LKBase]] = {}
+
+
+def _register_signal(
+    registry: dict[str, type[LKBase]],
+    names: Optional[str | list[str]],
+    klass: type[LKBase],
+) -> None:
+    if names is None:
+        return
+    if isinstance(names, str):
+        names = [names]
+    for name in names:
+        registry[name] = klass
+
+
+# names of the dumped fields per class, filled by LKBase._dump_into
+_DUMP_FIELDS: dict[type, tuple[str, ...]] = {}
 
 
 class LKBase:
+    # the subclasses are slotted dataclasses, keep instances free of __dict__
+    __slots__ = ()
+
+    # __signal_request__/__signal_response__, resolved once per class
+    _signal_request: Optional[str | list[str]] = None
+    _signal_response: Optional[str | list[str]] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._signal_request = getattr(cls, "__signal_request__", None)
+        cls._signal_response = getattr(cls, "__signal_response__", None)
+        # dataclass(slots=True) recreates the class, the last one registered wins
+        _register_signal(map_signal_request_to_class, cls._signal_request, cls)
+        _register_signal(map_signal_response_to_class, cls._signal_response, cls)
+
     def __str__(self) -> str:
         return self.__dump__()
 
     def __repr__(self) -> str:
         return self.__dump__()
 
-    def __dump__(self, indent: str = "") -> str:
-        if indent == "":
-            s = ["\nXXXXX " + self.__class__.__name__ + ":"]
-            indent = "    "
+    def __dump__(self, depth: int = 0) -> str:
+        if depth == 0:
+            out = ["\nXXXXX " + self.__class__.__name__ + ":"]
+            depth = 1
         else:
-            s = [f"{self.__class__.__name__}:"]
-        for attr in dir(self):
-            if attr.startswith("_"):
-                continue
+            out = [f"{self.__class__.__name__}:"]
+        self._dump_into(out, depth)
+        return "\n".join(out)
+
+    def _dump_into(self, out: list[str], depth: int) -> None:
+        """
+        Append the lines of the fields to out, the class name line is the caller's.
+        """
+        indent = "    " * depth
+        item_indent = indent + "    "
+        # all the subclasses are dataclasses, dump their fields in declaration order
+        cls = self.__class__
+        names = _DUMP_FIELDS.get(cls)
+        if names is None:
+            names = _DUMP_FIELDS[cls] = tuple(
+                f.name for f in fields(self) if f.repr  # type: ignore[arg-type]
+            )
+        for attr in names:
             value = getattr(self, attr)
-            # check if it's a method
-            if callable(value):
-                continue
             if isinstance(value, LKBase):
-                s.append(f"{indent}{attr} = {value.__dump__(indent + '    ')}")
-            elif isinstance(value, list):
-                s.append(f"{indent}{attr} = [")
+                out.append(f"{indent}{attr} = {value.__class__.__name__}:")
+                value._dump_into(out, depth + 1)
+            elif isinstance(value, (list, tuple)):
+                out.append(f"{indent}{attr} = [")
                 for v in value:
                     if isinstance(v, LKBase):
-                        s.append(f"{indent}    " + v.__dump__(indent + "        "))
+                        out.append(f"{item_indent}{v.__class__.__name__}:")
+                        v._dump_into(out, depth + 2)
                     else:
-                        s.append(f"{indent}    {v}")
-                s.append(f"{indent}]")
+                        out.append(f"{item_indent}{v}")
+                out.append(f"{indent}]")
             else:
-                s.append(f"{indent}{attr} = {value}")
-
-        return f"\n".join(s)
+                out.append(f"{indent}{attr} = {value}")
 
     @classmethod
     def from_lk(cls, pb: LKAny) -> LKBase:
@@ -79,15 +193,24 @@ class LKBase:
         raise NotImplementedError()
 
     def to_signal_request(self) -> lkrtc.SignalRequest:
-        msg = getattr(self, "__signal_request__", None)
+        msg = self._signal_request
         if msg is None:
             raise Exception(f"Cannot convert {self.__class__} to SignalRequest")
-        req = lkrtc.SignalRequest(**{msg: self.to_lk()})
+        req = _SignalRequest(**{msg: self.to_lk()})
         return req
 
+    def to_signal_request_bytes(self) -> bytes:
+        """
+        Same bytes as to_signal_request().SerializeToString(), used by Signaling.send.
+        """
+        msg = self._signal_request
+        if msg is None:
+            raise Exception(f"Cannot convert {self.__class__} to SignalRequest")
+        return _signal_request_bytes(msg, self.to_lk())  # type: ignore[arg-type]
+
     @classmethod
     def from_signal_response(cls, response: lkrtc.SignalResponse) -> LKBase:
-        msg = getattr(cls, "__signal_response__", None)
+        msg = cls._signal_response
         if msg is None:
             print(dir(cls))
             raise Exception(
@@ -99,7 +222,7 @@ class LKBase:
 
     @classmethod
     def from_signal_request(cls, request: lkrtc.SignalRequest) -> LKBase:
-        msg = getattr(cls, "__signal_request__", None)
+        msg = cls._signal_request
         if msg is None:
             raise Exception(f"Cannot convert {type(request)} to {cls.__class__}")
         if request.WhichOneof("message") != msg:
@@ -107,10 +230,10 @@ class LKBase:
         return cls.from_lk(getattr(request, msg))
 
     def get_response_name(self) -> Optional[str]:
-        return getattr(self, "__signal_response__", None)
+        return self._signal_response  # type: ignore[return-value]
 
     def get_request_name(self) -> Optional[str]:
-        return getattr(self, "__signal_request__", None)
+        return self._signal_request  # type: ignore[return-value]
 
 
 class ParticipantInfoState(LKEnum):
@@ -119,30 +242,15 @@ class ParticipantInfoState(LKEnum):
     ACTIVE = enum.auto()
     DISCONNECTED = enum.auto()
 
-    @classmethod
-    def from_lk(cls, state: lkmodels.ParticipantInfo.State) -> ParticipantInfoState:
-        if state == lkmodels.ParticipantInfo.State.JOINING:
-            return cls.JOINING
-        elif state == lkmodels.ParticipantInfo.State.JOINED:
-            return cls.JOINED
-        elif state == lkmodels.ParticipantInfo.State.ACTIVE:
-            return cls.ACTIVE
-        elif state == lkmodels.ParticipantInfo.State.DISCONNECTED:
-            return cls.DISCONNECTED
-        else:
-            raise ValueError(f"Unknown ParticipantState: {state}")
-
-    def to_lk(self) -> lkmodels.ParticipantInfo.State:
-        if self == ParticipantInfoState.JOINING:
-            return lkmodels.ParticipantInfo.State.JOINING
-        elif self == ParticipantInfoState.JOINED:
-            return lkmodels.ParticipantInfo.State.JOINED
-        elif self == ParticipantInfoState.ACTIVE:
-            return lkmodels.ParticipantInfo.State.ACTIVE
-        elif self == ParticipantInfoState.DISCONNECTED:
-            return lkmodels.ParticipantInfo.State.DISCONNECTED
-        else:
-            raise ValueError(f"Unknown ParticipantState: {self}")
+
+ParticipantInfoState._map_lk(
+    {
+        lkmodels.ParticipantInfo.State.JOINING: ParticipantInfoState.JOINING,
+        lkmodels.ParticipantInfo.State.JOINED: ParticipantInfoState.JOINED,
+        lkmodels.ParticipantInfo.State.ACTIVE: ParticipantInfoState.ACTIVE,
+        lkmodels.ParticipantInfo.State.DISCONNECTED: ParticipantInfoState.DISCONNECTED,
+    }
+)
 
 
 class TrackType(LKEnum):
@@ -150,29 +258,16 @@ class TrackType(LKEnum):
     VIDEO = "video"
     DATA = "data"
 
-    @classmethod
-    def from_lk(cls, track_type: lkmodels.TrackType) -> TrackType:
-        if track_type == lkmodels.TrackType.AUDIO:
-            return cls.AUDIO
-        elif track_type == lkmodels.TrackType.VIDEO:
-            return cls.VIDEO
-        elif track_type == lkmodels.TrackType.DATA:
-            return cls.DATA
-        else:
-            raise ValueError(f"Unknown TrackType: {track_type}")
-
-    def to_lk(self) -> lkmodels.TrackType:
-        if self.value == self.AUDIO:
-            return lkmodels.TrackType.AUDIO
-        elif self.value == self.VIDEO:
-            return lkmodels.TrackType.VIDEO
-        elif self.value == self.DATA:
-            return lkmodels.TrackType.DATA
-        else:
-            raise ValueError(f"Unknown TrackType: {self.value}")
+
+TrackType._map_lk(
+    {
+        lkmodels.TrackType.AUDIO: TrackType.AUDIO,
+        lkmodels.TrackType.VIDEO: TrackType.VIDEO,
+        lkmodels.TrackType.DATA: TrackType.DATA,
+    }
+)
 
 
-@dataclass
 class TrackSource(LKEnum):
     """
     UNKNOWN = 0;
@@ -189,34 +284,16 @@ class TrackSource(LKEnum):
     SCREEN_SHARE = enum.auto()
     SCREEN_SHARE_AUDIO = enum.auto()
 
-    @classmethod
-    def from_lk(cls, source: lkmodels.TrackSource) -> TrackSource:
-        if source == lkmodels.TrackSource.UNKNOWN:
-            return cls.UNKNOWN
-        elif source == lkmodels.TrackSource.CAMERA:
-            return cls.CAMERA
-        elif source == lkmodels.TrackSource.MICROPHONE:
-            return cls.MICROPHONE
-        elif source == lkmodels.TrackSource.SCREEN_SHARE:
-            return cls.SCREEN_SHARE
-        elif source == lkmodels.TrackSource.SCREEN_SHARE_AUDIO:
-            return cls.SCREEN_SHARE_AUDIO
-        else:
-            raise ValueError(f"Unknown TrackSource: {source}")
-
-    def to_lk(self) -> lkmodels.TrackSource:
-        if self.value == self.UNKNOWN:
-            return lkmodels.TrackSource.UNKNOWN
-        elif self.value == self.CAMERA:
-            return lkmodels.TrackSource.CAMERA
-        elif self.value == self.MICROPHONE:
-            return lkmodels.TrackSource.MICROPHONE
-        elif self.value == self.SCREEN_SHARE:
-            return lkmodels.TrackSource.SCREEN_SHARE
-        elif self.value == self.SCREEN_SHARE_AUDIO:
-            return lkmodels.TrackSource.SCREEN_SHARE_AUDIO
-        else:
-            raise ValueError(f"Unknown TrackSource: {self.value}")
+
+TrackSource._map_lk(
+    {
+        lkmodels.TrackSource.UNKNOWN: TrackSource.UNKNOWN,
+        lkmodels.TrackSource.CAMERA: TrackSource.CAMERA,
+        lkmodels.TrackSource.MICROPHONE: TrackSource.MICROPHONE,
+        lkmodels.TrackSource.SCREEN_SHARE: TrackSource.SCREEN_SHARE,
+        lkmodels.TrackSource.SCREEN_SHARE_AUDIO: TrackSource.SCREEN_SHARE_AUDIO,
+    }
+)
 
 
 class VideoQuality(LKEnum):
@@ -233,33 +310,18 @@ class VideoQuality(LKEnum):
     HIGH = enum.auto()
     OFF = enum.auto()
 
-    @classmethod
-    def from_lk(cls, layer: lkmodels.VideoQuality) -> VideoQuality:
-        if layer == lkmodels.VideoQuality.LOW:
-            return cls.LOW
-        elif layer == lkmodels.VideoQuality.MEDIUM:
-            return cls.MEDIUM
-        elif layer == lkmodels.VideoQuality.HIGH:
-            return cls.HIGH
-        elif layer == lkmodels.VideoQuality.OFF:
-            return cls.OFF
-        else:
-            raise ValueError(f"Unknown VideoQuality: {layer}")
-
-    def to_lk(self) -> lkmodels.VideoQuality:
-        if self.value == self.LOW:
-            return lkmodels.VideoQuality.LOW
-        elif self.value == self.MEDIUM:
-            return lkmodels.VideoQuality.MEDIUM
-        elif self.value == self.HIGH:
-            return lkmodels.VideoQuality.HIGH
-        elif self.value == self.OFF:
-            return lkmodels.VideoQuality.OFF
-        else:
-            raise ValueError(f"Unknown VideoQuality: {self.value}")
+
+VideoQuality._map_lk(
+    {
+        lkmodels.VideoQuality.LOW: VideoQuality.LOW,
+        lkmodels.VideoQuality.MEDIUM: VideoQuality.MEDIUM,
+        lkmodels.VideoQuality.HIGH: VideoQuality.HIGH,
+        lkmodels.VideoQuality.OFF: VideoQuality.OFF,
+    }
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class VideoLayer(LKBase):
     """
     // for tracks with a single layer, this should be HIGH
@@ -297,7 +359,7 @@ class VideoLayer(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SimulcastCodecInfo(LKBase):
     """
     string mime_type = 1;
@@ -309,27 +371,29 @@ class SimulcastCodecInfo(LKBase):
     mime_type: str
     mid: str
     cid: str
-    layers: List[VideoLayer]
+    layers: Sequence[VideoLayer]
 
     @classmethod
     def from_lk(cls, codec: lkmodels.SimulcastCodecInfo) -> SimulcastCodecInfo:
+        layers = codec.layers
         return cls(
-            codec.mime_type,
-            codec.mid,
+            sys.intern(codec.mime_type),
+            sys.intern(codec.mid),
             codec.cid,
-            [VideoLayer.from_lk(layer) for layer in codec.layers],
+            tuple(map(VideoLayer.from_lk, layers)) if layers else (),
         )
 
     def to_lk(self) -> lkmodels.SimulcastCodecInfo:
-        return lkmodels.SimulcastCodecInfo(
+        pb = lkmodels.SimulcastCodecInfo(
             mime_type=self.mime_type,
             mid=self.mid,
             cid=self.cid,
-            layers=[layer.to_lk() for layer in self.layers],
         )
+        pb.layers.extend(layer.to_lk() for layer in self.layers)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class TrackInfo(LKBase):
     """
     string sid = 1;
@@ -366,15 +430,18 @@ class TrackInfo(LKBase):
     simulcast: bool
     disable_dtx: bool
     source: TrackSource
-    layers: List[VideoLayer]
+    layers: Sequence[VideoLayer]
     mime_type: str
     mid: str
-    codecs: List[SimulcastCodecInfo]
+    codecs: Sequence[SimulcastCodecInfo]
     stereo: bool
     disable_red: bool
 
     @classmethod
     def from_lk(cls, track_info: lkmodels.TrackInfo) -> TrackInfo:
+        # audio and non simulcast tracks have no layers/codecs, skip the loops
+        layers = track_info.layers
+        codecs = track_info.codecs
         return cls(
             sid=track_info.sid,
             type=TrackType.from_lk(track_info.type),
@@ -385,16 +452,16 @@ class TrackInfo(LKBase):
             simulcast=track_info.simulcast,
             disable_dtx=track_info.disable_dtx,
             source=TrackSource.from_lk(track_info.source),
-            layers=[VideoLayer.from_lk(layer) for layer in track_info.layers],
-            mime_type=track_info.mime_type,
-            mid=track_info.mid,
-            codecs=[SimulcastCodecInfo.from_lk(c) for c in track_info.codecs],
+            layers=tuple(map(VideoLayer.from_lk, layers)) if layers else (),
+            mime_type=sys.intern(track_info.mime_type),
+            mid=sys.intern(track_info.mid),
+            codecs=tuple(map(SimulcastCodecInfo.from_lk, codecs)) if codecs else (),
             stereo=track_info.stereo,
             disable_red=track_info.disable_red,
         )
 
     def to_lk(self) -> lkmodels.TrackInfo:
-        return lkmodels.TrackInfo(
+        pb = lkmodels.TrackInfo(
             sid=self.sid,
             type=self.type.to_lk(),
             name=self.name,
@@ -404,16 +471,17 @@ class TrackInfo(LKBase):
             simulcast=self.simulcast,
             disable_dtx=self.disable_dtx,
             source=self.source.to_lk(),
-            layers=[layer.to_lk() for layer in self.layers],
             mime_type=self.mime_type,
             mid=self.mid,
-            codecs=[c.to_lk() for c in self.codecs],
             stereo=self.stereo,
             disable_red=self.disable_red,
         )
+        pb.layers.extend(layer.to_lk() for layer in self.layers)
+        pb.codecs.extend(c.to_lk() for c in self.codecs)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class ParticipantPermission(LKBase):
     """
     // allow participant to subscribe to other tracks in the room
@@ -454,7 +522,7 @@ class ParticipantPermission(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ParticipantInfo(LKBase):
     """
     enum State {
@@ -487,7 +555,7 @@ class ParticipantInfo(LKBase):
     sid: ParticipantId
     identity: str
     state: ParticipantInfoState
-    tracks: List["TrackInfo"]
+    tracks: Sequence["TrackInfo"]
     metadata: str
     joined_at: Time
     name: str
@@ -498,37 +566,39 @@ class ParticipantInfo(LKBase):
 
     @classmethod
     def from_lk(cls, info: lkmodels.ParticipantInfo) -> ParticipantInfo:
+        tracks = info.tracks
         return cls(
             sid=info.sid,
             identity=info.identity,
             state=ParticipantInfoState.from_lk(info.state),
-            tracks=[TrackInfo.from_lk(t) for t in info.tracks],
+            tracks=tuple(map(TrackInfo.from_lk, tracks)) if tracks else (),
             metadata=info.metadata,
             joined_at=Time(info.joined_at),
             name=info.name,
             version=info.version,
             permission=ParticipantPermission.from_lk(info.permission),
-            region=info.region,
+            region=sys.intern(info.region),
             is_publisher=info.is_publisher,
         )
 
     def to_lk(self) -> lkmodels.ParticipantInfo:
-        return lkmodels.ParticipantInfo(
+        pb = lkmodels.ParticipantInfo(
             sid=self.sid,
             identity=self.identity,
             state=self.state.to_lk(),
-            tracks=[t.to_lk() for t in self.tracks],
             metadata=self.metadata,
             joined_at=self.joined_at,
             name=self.name,
             version=self.version,
-            permission=self.permission.to_lk(),
             region=self.region,
             is_publisher=self.is_publisher,
         )
+        pb.permission.CopyFrom(self.permission.to_lk())
+        pb.tracks.extend(t.to_lk() for t in self.tracks)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class Codec(LKBase):
     """
     string mime = 1;
@@ -541,7 +611,7 @@ class Codec(LKBase):
     @classmethod
     def from_lk(cls, codec: lkmodels.Codec) -> Codec:
         return cls(
-            mime=codec.mime,
+            mime=sys.intern(codec.mime),
             fmtp_line=codec.fmtp_line,
         )
 
@@ -552,7 +622,7 @@ class Codec(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Room(LKBase):
     """
     string sid = 1;
@@ -573,7 +643,7 @@ class Room(LKBase):
     max_participants: int
     creation_time: Time
     turn_password: str
-    enabled_codecs: List[Codec]
+    enabled_codecs: Sequence[Codec]
     metadata: str
     num_participants: int
     active_recording: bool
@@ -587,28 +657,29 @@ class Room(LKBase):
             max_participants=room.max_participants,
             creation_time=Time(room.creation_time),
             turn_password=room.turn_password,
-            enabled_codecs=[Codec.from_lk(c) for c in room.enabled_codecs],
+            enabled_codecs=tuple(map(Codec.from_lk, room.enabled_codecs)),
             metadata=room.metadata,
             num_participants=room.num_participants,
             active_recording=room.active_recording,
         )
 
     def to_lk(self) -> lkmodels.Room:
-        return lkmodels.Room(
+        pb = lkmodels.Room(
             sid=self.sid,
             name=self.name,
             empty_timeout=self.empty_timeout,
             max_participants=self.max_participants,
             creation_time=self.creation_time,
             turn_password=self.turn_password,
-            enabled_codecs=[c.to_lk() for c in self.enabled_codecs],
             metadata=self.metadata,
             num_participants=self.num_participants,
             active_recording=self.active_recording,
         )
+        pb.enabled_codecs.extend(c.to_lk() for c in self.enabled_codecs)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class ICEServer(LKBase):
     """
     repeated string urls = 1;
@@ -616,14 +687,14 @@ class ICEServer(LKBase):
     string credential = 3;
     """
 
-    urls: List[str]
+    urls: Sequence[str]
     username: str
     credential: str
 
     @classmethod
     def from_lk(cls, ice: lkrtc.ICEServer) -> ICEServer:
         return cls(
-            urls=[url for url in ice.urls],
+            urls=tuple(ice.urls),
             username=ice.username,
             credential=ice.credential,
         )
@@ -647,29 +718,17 @@ class ClientConfigSetting(LKEnum):
     DISABLED = enum.auto()
     ENABLED = enum.auto()
 
-    @classmethod
-    def from_lk(cls, setting: lkmodels.ClientConfigSetting) -> ClientConfigSetting:
-        if setting == lkmodels.ClientConfigSetting.UNSET:
-            return cls.UNSET
-        elif setting == lkmodels.ClientConfigSetting.DISABLED:
-            return cls.DISABLED
-        elif setting == lkmodels.ClientConfigSetting.ENABLED:
-            return cls.ENABLED
-        else:
-            raise ValueError(f"Unknown ClientConfigSetting: {setting}")
-
-    def to_lk(self) -> lkmodels.ClientConfigSetting:
-        if self.value == self.UNSET:
-            return lkmodels.ClientConfigSetting.UNSET
-        elif self.value == self.DISABLED:
-            return lkmodels.ClientConfigSetting.DISABLED
-        elif self.value == self.ENABLED:
-            return lkmodels.ClientConfigSetting.ENABLED
-        else:
-            raise ValueError(f"Unknown ClientConfigSetting: {self.value}")
+
+ClientConfigSetting._map_lk(
+    {
+        lkmodels.ClientConfigSetting.UNSET: ClientConfigSetting.UNSET,
+        lkmodels.ClientConfigSetting.DISABLED: ClientConfigSetting.DISABLED,
+        lkmodels.ClientConfigSetting.ENABLED: ClientConfigSetting.ENABLED,
+    }
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class VideoConfiguration(LKBase):
     """
     ClientConfigSetting hardware_encoder = 1;
@@ -689,27 +748,27 @@ class VideoConfiguration(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class DisabledCodecs(LKBase):
     """
     repeated Codec codecs = 1;
     """
 
-    codecs: List[Codec]
+    codecs: Sequence[Codec]
 
     @classmethod
     def from_lk(cls, disabled_codecs: lkmodels.DisabledCodecs) -> DisabledCodecs:
         return cls(
-            codecs=[Codec.from_lk(c) for c in disabled_codecs.codecs],
+            codecs=tuple(map(Codec.from_lk, disabled_codecs.codecs)),
         )
 
     def to_lk(self) -> lkmodels.DisabledCodecs:
-        return lkmodels.DisabledCodecs(
-            codecs=[c.to_lk() for c in self.codecs],
-        )
+        pb = lkmodels.DisabledCodecs()
+        pb.codecs.extend(c.to_lk() for c in self.codecs)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class ClientConfiguration(LKBase):
     """
     VideoConfiguration video = 1;
@@ -737,13 +796,14 @@ class ClientConfiguration(LKBase):
         )
 
     def to_lk(self) -> lkmodels.ClientConfiguration:
-        return lkmodels.ClientConfiguration(
-            video=self.video.to_lk(),
-            screen=self.screen.to_lk(),
+        pb = lkmodels.ClientConfiguration(
             resume_connection=self.resume_connection.to_lk(),
-            disabled_codecs=self.disabled_codecs.to_lk(),
             force_relay=self.force_relay.to_lk(),
         )
+        pb.video.CopyFrom(self.video.to_lk())
+        pb.screen.CopyFrom(self.screen.to_lk())
+        pb.disabled_codecs.CopyFrom(self.disabled_codecs.to_lk())
+        return pb
 
 
 class ServerInfoEdition(LKEnum):
@@ -756,25 +816,16 @@ class ServerInfoEdition(LKEnum):
     STANDARD = enum.auto()
     CLOUD = enum.auto()
 
-    @classmethod
-    def from_lk(cls, edition: lkmodels.ServerInfo.Edition) -> ServerInfoEdition:
-        if edition == lkmodels.ServerInfo.Edition.Standard:
-            return cls.STANDARD
-        elif edition == lkmodels.ServerInfo.Edition.Cloud:
-            return cls.CLOUD
-        else:
-            raise ValueError(f"Unknown ServerInfo_Edition: {edition}")
 
-    def to_lk(self) -> lkmodels.ServerInfo.Edition:
-        if self.value == self.STANDARD:
-            return lkmodels.ServerInfo.Edition.Standard
-        elif self.value == self.CLOUD:
-            return lkmodels.ServerInfo.Edition.Cloud
-        else:
-            raise ValueError(f"Unknown ServerInfo_Edition: {self.value}")
+ServerInfoEdition._map_lk(
+    {
+        lkmodels.ServerInfo.Edition.Standard: ServerInfoEdition.STANDARD,
+        lkmodels.ServerInfo.Edition.Cloud: ServerInfoEdition.CLOUD,
+    }
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class ServerInfo(LKBase):
     """
     enum Edition {
@@ -803,8 +854,8 @@ class ServerInfo(LKBase):
             edition=ServerInfoEdition.from_lk(info.edition),
             version=info.version,
             protocol=info.protocol,
-            region=info.region,
-            node_id=info.node_id,
+            region=sys.intern(info.region),
+            node_id=sys.intern(info.node_id),
             debug_info=info.debug_info,
         )
 
@@ -819,7 +870,7 @@ class ServerInfo(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class JoinResponse(LKBase):
     __signal_response__ = "join"
     """
@@ -844,10 +895,10 @@ class JoinResponse(LKBase):
     """
     room: Room
     participant: ParticipantInfo
-    other_participants: List[ParticipantInfo]
+    other_participants: Sequence[ParticipantInfo]
 
     server_version: str
-    ice_servers: List[ICEServer]
+    ice_servers: Sequence[ICEServer]
     subscriber_primary: bool
     alternative_url: str
     client_configuration: ClientConfiguration
@@ -861,11 +912,11 @@ class JoinResponse(LKBase):
         return cls(
             room=Room.from_lk(resp.room),
             participant=ParticipantInfo.from_lk(resp.participant),
-            other_participants=[
-                ParticipantInfo.from_lk(p) for p in resp.other_participants
-            ],
+            other_participants=tuple(
+                map(ParticipantInfo.from_lk, resp.other_participants)
+            ),
             server_version=resp.server_version,
-            ice_servers=[ICEServer.from_lk(i) for i in resp.ice_servers],
+            ice_servers=tuple(map(ICEServer.from_lk, resp.ice_servers)),
             subscriber_primary=resp.subscriber_primary,
             alternative_url=resp.alternative_url,
             client_configuration=ClientConfiguration.from_lk(resp.client_configuration),
@@ -876,23 +927,23 @@ class JoinResponse(LKBase):
         )
 
     def to_lk(self) -> lkrtc.JoinResponse:
-        return lkrtc.JoinResponse(
-            room=self.room.to_lk(),
-            participant=self.participant.to_lk(),
-            other_participants=[p.to_lk() for p in self.other_participants],
+        pb = lkrtc.JoinResponse(
             server_version=self.server_version,
-            ice_servers=[i.to_lk() for i in self.ice_servers],
             subscriber_primary=self.subscriber_primary,
             alternative_url=self.alternative_url,
-            client_configuration=self.client_configuration.to_lk(),
             server_region=self.server_region,
             ping_timeout=self.ping_timeout,
             ping_interval=self.ping_interval,
-            server_info=self.server_info.to_lk(),
         )
+        pb.room.CopyFrom(self.room.to_lk())
+        pb.participant.CopyFrom(self.participant.to_lk())
+        pb.client_configuration.CopyFrom(self.client_configuration.to_lk())
+        pb.server_info.CopyFrom(self.server_info.to_lk())
+        pb.other_participants.extend(p.to_lk() for p in self.other_participants)
+        pb.ice_servers.extend(i.to_lk() for i in self.ice_servers)
+        return pb
 
 
-@dataclass
 class SignalTarget(LKEnum):
     """
     PUBLISHER = 0;
@@ -903,25 +954,16 @@ class SignalTarget(LKEnum):
     PUBLISHER = enum.auto()
     SUBSCRIBER = enum.auto()
 
-    @classmethod
-    def from_lk(cls, target: lkrtc.SignalTarget) -> SignalTarget:
-        if target == lkrtc.SignalTarget.PUBLISHER:
-            return cls.PUBLISHER
-        elif target == lkrtc.SignalTarget.SUBSCRIBER:
-            return cls.SUBSCRIBER
-        else:
-            raise ValueError(f"Unknown SignalTarget: {target}")
 
-    def to_lk(self) -> lkrtc.SignalTarget:
-        if self.value == self.PUBLISHER:
-            return lkrtc.SignalTarget.PUBLISHER
-        elif self.value == self.SUBSCRIBER:
-            return lkrtc.SignalTarget.SUBSCRIBER
-        else:
-            raise ValueError(f"Unknown SignalTarget: {self.value}")
+SignalTarget._map_lk(
+    {
+        lkrtc.SignalTarget.PUBLISHER: SignalTarget.PUBLISHER,
+        lkrtc.SignalTarget.SUBSCRIBER: SignalTarget.SUBSCRIBER,
+    }
+)
 
 
-@dataclass
+@dataclass(slots=True, init=False)
 class TrickleRequest(LKBase):
     __signal_request__ = "trickle"
     __signal_response__ = "trickle"
@@ -929,26 +971,58 @@ class TrickleRequest(LKBase):
     string candidateInit = 1;
     SignalTarget target = 2;
     """
-    candidate: RTCIceCandidate
+    candidateInit: str
     target: SignalTarget
+    # parsed from candidateInit on first access, see candidate
+    _candidate: Optional[RTCIceCandidate] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __init__(
+        self,
+        candidate: Optional[RTCIceCandidate],
+        target: SignalTarget,
+        *,
+        candidateInit: Optional[str] = None,
+    ) -> None:
+        # received requests only carry the candidateInit, parsed on demand
+        if candidateInit is None:
+            if candidate is None:
+                raise TypeError("TrickleRequest needs a candidate or a candidateInit")
+            candidateInit = aio_to_candidate_init(candidate)
+        self.candidateInit = candidateInit
+        self.target = target
+        self._candidate = candidate
+
+    @property
+    def candidate(self) -> RTCIceCandidate:
+        candidate = self._candidate
+        if candidate is None:
+            candidate = self._candidate = proto_to_aio_candidate(self.candidateInit)
+        return candidate
+
+    @classmethod
+    def from_candidate(
+        cls, candidate: RTCIceCandidate, target: SignalTarget
+    ) -> TrickleRequest:
+        return cls(candidate, target)
 
     @classmethod
     def from_lk(cls, req: lkrtc.TrickleRequest) -> TrickleRequest:
-        candidate = proto_to_aio_candidate(req.candidateInit)
         return cls(
-            candidate=candidate,
-            target=SignalTarget.from_lk(req.target),
+            None,
+            SignalTarget.from_lk(req.target),
+            candidateInit=req.candidateInit,
         )
 
     def to_lk(self) -> lkrtc.TrickleRequest:
-        candidateInit = aio_to_proto_candidate(self.candidate)
         return lkrtc.TrickleRequest(
-            candidateInit=candidateInit,
+            candidateInit=self.candidateInit,
             target=self.target.to_lk(),
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class MuteTrackRequest(LKBase):
     __signal_request__ = "mute"
     __signal_response__ = "mute"
@@ -973,27 +1047,27 @@ class MuteTrackRequest(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ParticipantUpdate(LKBase):
     __signal_response__ = "update"
     """
     repeated ParticipantInfo participants = 1;
     """
-    participants: List[ParticipantInfo]
+    participants: Sequence[ParticipantInfo]
 
     @classmethod
     def from_lk(cls, update: lkrtc.ParticipantUpdate) -> ParticipantUpdate:
         return cls(
-            participants=[ParticipantInfo.from_lk(p) for p in update.participants],
+            participants=tuple(map(ParticipantInfo.from_lk, update.participants)),
         )
 
     def to_lk(self) -> lkrtc.ParticipantUpdate:
-        return lkrtc.ParticipantUpdate(
-            participants=[p.to_lk() for p in self.participants],
-        )
+        pb = lkrtc.ParticipantUpdate()
+        pb.participants.extend(p.to_lk() for p in self.participants)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class TrackPublishedResponse(LKBase):
     __signal_response__ = "track_published"
     """
@@ -1011,10 +1085,11 @@ class TrackPublishedResponse(LKBase):
         )
 
     def to_lk(self) -> lkrtc.TrackPublishedResponse:
-        return lkrtc.TrackPublishedResponse(
+        pb = lkrtc.TrackPublishedResponse(
             cid=self.cid,
-            track=self.track.to_lk(),
         )
+        pb.track.CopyFrom(self.track.to_lk())
+        return pb
 
 
 class DisconnectReason(LKEnum):
@@ -1038,49 +1113,22 @@ class DisconnectReason(LKEnum):
     STATE_MISMATCH = enum.auto()
     JOIN_FAILURE = enum.auto()
 
-    @classmethod
-    def from_lk(cls, reason: lkmodels.DisconnectReason) -> DisconnectReason:
-        if reason == lkmodels.DisconnectReason.UNKNOWN_REASON:
-            return cls.UNKNOWN_REASON
-        elif reason == lkmodels.DisconnectReason.CLIENT_INITIATED:
-            return cls.CLIENT_INITIATED
-        elif reason == lkmodels.DisconnectReason.DUPLICATE_IDENTITY:
-            return cls.DUPLICATE_IDENTITY
-        elif reason == lkmodels.DisconnectReason.SERVER_SHUTDOWN:
-            return cls.SERVER_SHUTDOWN
-        elif reason == lkmodels.DisconnectReason.PARTICIPANT_REMOVED:
-            return cls.PARTICIPANT_REMOVED
-        elif reason == lkmodels.DisconnectReason.ROOM_DELETED:
-            return cls.ROOM_DELETED
-        elif reason == lkmodels.DisconnectReason.STATE_MISMATCH:
-            return cls.STATE_MISMATCH
-        elif reason == lkmodels.DisconnectReason.JOIN_FAILURE:
-            return cls.JOIN_FAILURE
-        else:
-            raise ValueError(f"Unknown DisconnectReason: {reason}")
-
-    def to_lk(self) -> lkmodels.DisconnectReason:
-        if self.value == self.UNKNOWN_REASON:
-            return lkmodels.DisconnectReason.UNKNOWN_REASON
-        elif self.value == self.CLIENT_INITIATED:
-            return lkmodels.DisconnectReason.CLIENT_INITIATED
-        elif self.value == self.DUPLICATE_IDENTITY:
-            return lkmodels.DisconnectReason.DUPLICATE_IDENTITY
-        elif self.value == self.SERVER_SHUTDOWN:
-            return lkmodels.DisconnectReason.SERVER_SHUTDOWN
-        elif self.value == self.PARTICIPANT_REMOVED:
-            return lkmodels.DisconnectReason.PARTICIPANT_REMOVED
-        elif self.value == self.ROOM_DELETED:
-            return lkmodels.DisconnectReason.ROOM_DELETED
-        elif self.value == self.STATE_MISMATCH:
-            return lkmodels.DisconnectReason.STATE_MISMATCH
-        elif self.value == self.JOIN_FAILURE:
-            return lkmodels.DisconnectReason.JOIN_FAILURE
-        else:
-            raise ValueError(f"Unknown DisconnectReason: {self.value}")
+
+DisconnectReason._map_lk(
+    {
+        lkmodels.DisconnectReason.UNKNOWN_REASON: DisconnectReason.UNKNOWN_REASON,
+        lkmodels.DisconnectReason.CLIENT_INITIATED: DisconnectReason.CLIENT_INITIATED,
+        lkmodels.DisconnectReason.DUPLICATE_IDENTITY: DisconnectReason.DUPLICATE_IDENTITY,
+        lkmodels.DisconnectReason.SERVER_SHUTDOWN: DisconnectReason.SERVER_SHUTDOWN,
+        lkmodels.DisconnectReason.PARTICIPANT_REMOVED: DisconnectReason.PARTICIPANT_REMOVED,
+        lkmodels.DisconnectReason.ROOM_DELETED: DisconnectReason.ROOM_DELETED,
+        lkmodels.DisconnectReason.STATE_MISMATCH: DisconnectReason.STATE_MISMATCH,
+        lkmodels.DisconnectReason.JOIN_FAILURE: DisconnectReason.JOIN_FAILURE,
+    }
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class LeaveRequest(LKBase):
     __signal_request__ = "leave"
     __signal_response__ = "leave"
@@ -1107,7 +1155,7 @@ class LeaveRequest(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SpeakerInfo(LKBase):
     """
     string sid = 1;
@@ -1137,27 +1185,27 @@ class SpeakerInfo(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SpeakersChanged(LKBase):
     __signal_response__ = "speakers_changed"
     """
     repeated SpeakerInfo speakers = 1;
     """
-    speakers: List[SpeakerInfo]
+    speakers: Sequence[SpeakerInfo]
 
     @classmethod
     def from_lk(cls, update: lkrtc.SpeakersChanged) -> SpeakersChanged:
         return cls(
-            speakers=[SpeakerInfo.from_lk(s) for s in update.speakers],
+            speakers=tuple(map(SpeakerInfo.from_lk, update.speakers)),
         )
 
     def to_lk(self) -> lkrtc.SpeakersChanged:
-        return lkrtc.SpeakersChanged(
-            speakers=[s.to_lk() for s in self.speakers],
-        )
+        pb = lkrtc.SpeakersChanged()
+        pb.speakers.extend(s.to_lk() for s in self.speakers)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class RoomUpdate(LKBase):
     __signal_response__ = "room_update"
     """
@@ -1172,12 +1220,11 @@ class RoomUpdate(LKBase):
         )
 
     def to_lk(self) -> lkrtc.RoomUpdate:
-        return lkrtc.RoomUpdate(
-            room=self.room.to_lk(),
-        )
+        pb = lkrtc.RoomUpdate()
+        pb.room.CopyFrom(self.room.to_lk())
+        return pb
 
 
-@dataclass
 class ConnectionQuality(LKEnum):
     """
     POOR = 0;
@@ -1189,29 +1236,17 @@ class ConnectionQuality(LKEnum):
     GOOD = 1
     EXCELLENT = 2
 
-    @classmethod
-    def from_lk(cls, quality: lkmodels.ConnectionQuality) -> ConnectionQuality:
-        if quality == lkmodels.ConnectionQuality.POOR:
-            return cls.POOR
-        elif quality == lkmodels.ConnectionQuality.GOOD:
-            return cls.GOOD
-        elif quality == lkmodels.ConnectionQuality.EXCELLENT:
-            return cls.EXCELLENT
-        else:
-            raise ValueError(f"Unknown ConnectionQuality: {quality}")
-
-    def to_lk(self) -> lkmodels.ConnectionQuality:
-        if self.value == self.POOR:
-            return lkmodels.ConnectionQuality.POOR
-        elif self.value == self.GOOD:
-            return lkmodels.ConnectionQuality.GOOD
-        elif self.value == self.EXCELLENT:
-            return lkmodels.ConnectionQuality.EXCELLENT
-        else:
-            raise ValueError(f"Unknown ConnectionQuality: {self.value}")
+
+ConnectionQuality._map_lk(
+    {
+        lkmodels.ConnectionQuality.POOR: ConnectionQuality.POOR,
+        lkmodels.ConnectionQuality.GOOD: ConnectionQuality.GOOD,
+        lkmodels.ConnectionQuality.EXCELLENT: ConnectionQuality.EXCELLENT,
+    }
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class ConnectionQualityInfo(LKBase):
     """
     string participant_sid = 1;
@@ -1239,27 +1274,26 @@ class ConnectionQualityInfo(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ConnectionQualityUpdate(LKBase):
     __signal_response__ = "connection_quality"
     """
     repeated ConnectionQualityInfo updates = 1;
     """
-    updates: List[ConnectionQualityInfo]
+    updates: Sequence[ConnectionQualityInfo]
 
     @classmethod
     def from_lk(cls, update: lkrtc.ConnectionQualityUpdate) -> ConnectionQualityUpdate:
         return cls(
-            updates=[ConnectionQualityInfo.from_lk(u) for u in update.updates],
+            updates=tuple(map(ConnectionQualityInfo.from_lk, update.updates)),
         )
 
     def to_lk(self) -> lkrtc.ConnectionQualityUpdate:
-        return lkrtc.ConnectionQualityUpdate(
-            updates=[u.to_lk() for u in self.updates],
-        )
+        pb = lkrtc.ConnectionQualityUpdate()
+        pb.updates.extend(u.to_lk() for u in self.updates)
+        return pb
 
 
-@dataclass
 class StreamState(LKEnum):
     """
     ACTIVE = 0;
@@ -1269,25 +1303,16 @@ class StreamState(LKEnum):
     ACTIVE = 0
     PAUSED = 1
 
-    @classmethod
-    def from_lk(cls, state: lkrtc.StreamState) -> StreamState:
-        if state == lkrtc.StreamState.ACTIVE:
-            return cls.ACTIVE
-        elif state == lkrtc.StreamState.PAUSED:
-            return cls.PAUSED
-        else:
-            raise ValueError(f"Unknown StreamState: {state}")
 
-    def to_lk(self) -> lkrtc.StreamState:
-        if self.value == self.ACTIVE:
-            return lkrtc.StreamState.ACTIVE
-        elif self.value == self.PAUSED:
-            return lkrtc.StreamState.PAUSED
-        else:
-            raise ValueError(f"Unknown StreamState: {self.value}")
+StreamState._map_lk(
+    {
+        lkrtc.StreamState.ACTIVE: StreamState.ACTIVE,
+        lkrtc.StreamState.PAUSED: StreamState.PAUSED,
+    }
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamStateInfo(LKBase):
     """
     string participant_sid = 1;
@@ -1315,27 +1340,27 @@ class StreamStateInfo(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamStateUpdate(LKBase):
     __signal_response__ = "stream_state_update"
     """
     repeated StreamStateInfo stream_states = 1;
     """
-    stream_states: List[StreamStateInfo]
+    stream_states: Sequence[StreamStateInfo]
 
     @classmethod
     def from_lk(cls, update: lkrtc.StreamStateUpdate) -> StreamStateUpdate:
         return cls(
-            stream_states=[StreamStateInfo.from_lk(s) for s in update.stream_states],
+            stream_states=tuple(map(StreamStateInfo.from_lk, update.stream_states)),
         )
 
     def to_lk(self) -> lkrtc.StreamStateUpdate:
-        return lkrtc.StreamStateUpdate(
-            stream_states=[s.to_lk() for s in self.stream_states],
-        )
+        pb = lkrtc.StreamStateUpdate()
+        pb.stream_states.extend(s.to_lk() for s in self.stream_states)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class SubscribedQuality(LKBase):
     """
     VideoQuality quality = 1;
@@ -1359,7 +1384,7 @@ class SubscribedQuality(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SubscribedCodec(LKBase):
     """
     string codec = 1;
@@ -1367,23 +1392,24 @@ class SubscribedCodec(LKBase):
     """
 
     codec: str
-    qualities: List[SubscribedQuality]
+    qualities: Sequence[SubscribedQuality]
 
     @classmethod
     def from_lk(cls, codec: lkrtc.SubscribedCodec) -> SubscribedCodec:
         return cls(
             codec=codec.codec,
-            qualities=[SubscribedQuality.from_lk(q) for q in codec.qualities],
+            qualities=tuple(map(SubscribedQuality.from_lk, codec.qualities)),
         )
 
     def to_lk(self) -> lkrtc.SubscribedCodec:
-        return lkrtc.SubscribedCodec(
+        pb = lkrtc.SubscribedCodec(
             codec=self.codec,
-            qualities=[q.to_lk() for q in self.qualities],
         )
+        pb.qualities.extend(q.to_lk() for q in self.qualities)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class SubscribedQualityUpdate(LKBase):
     __signal_response__ = "subscribed_quality_update"
     """
@@ -1392,30 +1418,31 @@ class SubscribedQualityUpdate(LKBase):
     repeated SubscribedCodec subscribed_codecs = 3;
     """
     track_sid: str
-    subscribed_qualities: List[SubscribedQuality]
-    subscribed_codecs: List[SubscribedCodec]
+    subscribed_qualities: Sequence[SubscribedQuality]
+    subscribed_codecs: Sequence[SubscribedCodec]
 
     @classmethod
     def from_lk(cls, update: lkrtc.SubscribedQualityUpdate) -> SubscribedQualityUpdate:
         return cls(
             track_sid=update.track_sid,
-            subscribed_qualities=[
-                SubscribedQuality.from_lk(q) for q in update.subscribed_qualities
-            ],
-            subscribed_codecs=[
-                SubscribedCodec.from_lk(c) for c in update.subscribed_codecs
-            ],
+            subscribed_qualities=tuple(
+                map(SubscribedQuality.from_lk, update.subscribed_qualities)
+            ),
+            subscribed_codecs=tuple(
+                map(SubscribedCodec.from_lk, update.subscribed_codecs)
+            ),
         )
 
     def to_lk(self) -> lkrtc.SubscribedQualityUpdate:
-        return lkrtc.SubscribedQualityUpdate(
+        pb = lkrtc.SubscribedQualityUpdate(
             track_sid=self.track_sid,
-            subscribed_qualities=[q.to_lk() for q in self.subscribed_qualities],
-            subscribed_codecs=[c.to_lk() for c in self.subscribed_codecs],
         )
+        pb.subscribed_qualities.extend(q.to_lk() for q in self.subscribed_qualities)
+        pb.subscribed_codecs.extend(c.to_lk() for c in self.subscribed_codecs)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class SubscriptionPermissionUpdate(LKBase):
     __signal_response__ = "subscription_permission_update"
     """
@@ -1445,7 +1472,7 @@ class SubscriptionPermissionUpdate(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class TrackUnpublishedResponse(LKBase):
     __signal_response__ = "track_unpublished"
     """
@@ -1467,7 +1494,7 @@ class TrackUnpublishedResponse(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SimulcastCodec(LKBase):
     """
     string codec = 1;
@@ -1495,7 +1522,7 @@ class SimulcastCodec(LKBase):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class AddTrackRequest(LKBase):
     __signal_request__ = "add_track"
     """
@@ -1530,8 +1557,8 @@ class AddTrackRequest(LKBase):
     muted: bool
     disable_dtx: Optional[bool]
     source: TrackSource
-    layers: List[VideoLayer]
-    simulcast_codecs: List[SimulcastCodec]
+    layers: Sequence[VideoLayer]
+    simulcast_codecs: Sequence[SimulcastCodec]
     sid: Optional[str]
     stereo: Optional[bool]
     disable_red: Optional[bool]
@@ -1547,17 +1574,17 @@ class AddTrackRequest(LKBase):
             muted=request.muted,
             disable_dtx=request.disable_dtx,
             source=TrackSource.from_lk(request.source),
-            layers=[VideoLayer.from_lk(layer) for layer in request.layers],
-            simulcast_codecs=[
-                SimulcastCodec.from_lk(codec) for codec in request.simulcast_codecs
-            ],
+            layers=tuple(map(VideoLayer.from_lk, request.layers)),
+            simulcast_codecs=tuple(
+                map(SimulcastCodec.from_lk, request.simulcast_codecs)
+            ),
             sid=request.sid,
             stereo=request.stereo,
             disable_red=request.disable_red,
         )
 
     def to_lk(self) -> lkrtc.AddTrackRequest:
-        return lkrtc.AddTrackRequest(
+        pb = lkrtc.AddTrackRequest(
             cid=self.cid,
             name=self.name,
             type=self.type.to_lk(),
@@ -1566,15 +1593,16 @@ class AddTrackRequest(LKBase):
             muted=self.muted,
             disable_dtx=self.disable_dtx,
             source=self.source.to_lk(),
-            layers=[layer.to_lk() for layer in self.layers],
-            simulcast_codecs=[codec.to_lk() for codec in self.simulcast_codecs],
             sid=self.sid,
             stereo=self.stereo,
             disable_red=self.disable_red,
         )
+        pb.layers.extend(layer.to_lk() for layer in self.layers)
+        pb.simulcast_codecs.extend(codec.to_lk() for codec in self.simulcast_codecs)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class ParticipantTracks(LKBase):
     """
     // participant ID of participant to whom the tracks belong
@@ -1583,7 +1611,7 @@ class ParticipantTracks(LKBase):
     """
 
     participant_sid: ParticipantId
-    track_sids: List[TrackId]
+    track_sids: Sequence[TrackId]
 
     @classmethod
     def from_lk(
@@ -1591,17 +1619,18 @@ class ParticipantTracks(LKBase):
     ) -> ParticipantTracks:
         return cls(
             participant_sid=participant_tracks.participant_sid,
-            track_sids=[sid for sid in participant_tracks.track_sids],
+            track_sids=tuple(participant_tracks.track_sids),
         )
 
     def to_lk(self) -> lkmodels.ParticipantTracks:
-        return lkmodels.ParticipantTracks(
+        pb = lkmodels.ParticipantTracks(
             participant_sid=self.participant_sid,
-            track_sids=[sid for sid in self.track_sids],
         )
+        pb.track_sids.extend(sid for sid in self.track_sids)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateSubscription(LKBase):
     __signal_request__ = "subscription"
     """
@@ -1609,29 +1638,30 @@ class UpdateSubscription(LKBase):
     bool subscribe = 2;
     repeated ParticipantTracks participant_tracks = 3;
     """
-    track_sids: List[TrackId]
+    track_sids: Sequence[TrackId]
     subscribe: bool
-    participant_tracks: List[ParticipantTracks]
+    participant_tracks: Sequence[ParticipantTracks]
 
     @classmethod
     def from_lk(cls, update: lkrtc.UpdateSubscription) -> UpdateSubscription:
         return cls(
-            track_sids=[s for s in update.track_sids],
+            track_sids=tuple(update.track_sids),
             subscribe=update.subscribe,
-            participant_tracks=[
-                ParticipantTracks.from_lk(p) for p in update.participant_tracks
-            ],
+            participant_tracks=tuple(
+                map(ParticipantTracks.from_lk, update.participant_tracks)
+            ),
         )
 
     def to_lk(self) -> lkrtc.UpdateSubscription:
-        return lkrtc.UpdateSubscription(
-            track_sids=[s for s in self.track_sids],
+        pb = lkrtc.UpdateSubscription(
             subscribe=self.subscribe,
-            participant_tracks=[p.to_lk() for p in self.participant_tracks],
         )
+        pb.track_sids.extend(s for s in self.track_sids)
+        pb.participant_tracks.extend(p.to_lk() for p in self.participant_tracks)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateTrackSettings(LKBase):
     __signal_request__ = "track_setting"
     """
@@ -1646,7 +1676,7 @@ class UpdateTrackSettings(LKBase):
     uint32 height = 6;
     uint32 fps = 7;
     """
-    track_sids: List[str]
+    track_sids: Sequence[str]
     disabled: bool
     quality: Optional[VideoQuality]
     width: Optional[int]
@@ -1656,7 +1686,7 @@ class UpdateTrackSettings(LKBase):
     @classmethod
     def from_lk(cls, update: lkrtc.UpdateTrackSettings) -> UpdateTrackSettings:
         return cls(
-            track_sids=[s for s in update.track_sids],
+            track_sids=tuple(update.track_sids),
             disabled=update.disabled,
             quality=VideoQuality.from_lk(update.quality),
             width=update.width,
@@ -1665,17 +1695,18 @@ class UpdateTrackSettings(LKBase):
         )
 
     def to_lk(self) -> lkrtc.UpdateTrackSettings:
-        return lkrtc.UpdateTrackSettings(
-            track_sids=[s for s in self.track_sids],
+        pb = lkrtc.UpdateTrackSettings(
             disabled=self.disabled,
-            quality=self.quality.to_lk() if self.quality else None,
+            quality=self.quality.to_lk() if self.quality is not None else None,
             width=self.width,
             height=self.height,
             fps=self.fps,
         )
+        pb.track_sids.extend(s for s in self.track_sids)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateVideoLayers(LKBase):
     __signal_request__ = "update_layers"
     """
@@ -1683,23 +1714,24 @@ class UpdateVideoLayers(LKBase):
     repeated VideoLayer layers = 2;
     """
     track_sid: str
-    layers: List[VideoLayer]
+    layers: Sequence[VideoLayer]
 
     @classmethod
     def from_lk(cls, update: lkrtc.UpdateVideoLayers) -> UpdateVideoLayers:
         return cls(
             track_sid=update.track_sid,
-            layers=[VideoLayer.from_lk(layer) for layer in update.layers],
+            layers=tuple(map(VideoLayer.from_lk, update.layers)),
         )
 
     def to_lk(self) -> lkrtc.UpdateVideoLayers:
-        return lkrtc.UpdateVideoLayers(
+        pb = lkrtc.UpdateVideoLayers(
             track_sid=self.track_sid,
-            layers=[layer.to_lk() for layer in self.layers],
         )
+        pb.layers.extend(layer.to_lk() for layer in self.layers)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class TrackPermission(LKBase):
     """
     // permission could be granted either by participant sid or identity
@@ -1711,7 +1743,7 @@ class TrackPermission(LKBase):
 
     participant_sid: str
     all_tracks: bool
-    track_sids: List[str]
+    track_sids: Sequence[str]
     participant_identity: str
 
     @classmethod
@@ -1719,20 +1751,21 @@ class TrackPermission(LKBase):
         return cls(
             participant_sid=permission.participant_sid,
             all_tracks=permission.all_tracks,
-            track_sids=[s for s in permission.track_sids],
+            track_sids=tuple(permission.track_sids),
             participant_identity=permission.participant_identity,
         )
 
     def to_lk(self) -> lkrtc.TrackPermission:
-        return lkrtc.TrackPermission(
+        pb = lkrtc.TrackPermission(
             participant_sid=self.participant_sid,
             all_tracks=self.all_tracks,
-            track_sids=[s for s in self.track_sids],
             participant_identity=self.participant_identity,
         )
+        pb.track_sids.extend(s for s in self.track_sids)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class SubscriptionPermission(LKBase):
     __signal_request__ = "subscription_permission"
     """
@@ -1740,7 +1773,7 @@ class SubscriptionPermission(LKBase):
     repeated TrackPermission track_permissions = 2;
     """
     all_participants: bool
-    track_permissions: List[TrackPermission]
+    track_permissions: Sequence[TrackPermission]
 
     @classmethod
     def from_lk(
@@ -1748,19 +1781,20 @@ class SubscriptionPermission(LKBase):
     ) -> SubscriptionPermission:
         return cls(
             all_participants=permission.all_participants,
-            track_permissions=[
-                TrackPermission.from_lk(p) for p in permission.track_permissions
-            ],
+            track_permissions=tuple(
+                map(TrackPermission.from_lk, permission.track_permissions)
+            ),
         )
 
     def to_lk(self) -> lkrtc.SubscriptionPermission:
-        return lkrtc.SubscriptionPermission(
+        pb = lkrtc.SubscriptionPermission(
             all_participants=self.all_participants,
-            track_permissions=[p.to_lk() for p in self.track_permissions],
         )
+        pb.track_permissions.extend(p.to_lk() for p in self.track_permissions)
+        return pb
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionDescription(LKBase):
     __signal_request__ = ["offer", "answer"]  # check to_signal_request() method
     __signal_response__ = ["offer", "answer"]  # check from_signal_response() method
@@ -1790,14 +1824,18 @@ class SessionDescription(LKBase):
 
     def to_signal_request(self) -> lkrtc.SignalRequest:
         # special handling because offer and answer share the same type
-        return lkrtc.SignalRequest(**{self.type: self.to_lk()})
+        return _SignalRequest(**{self.type: self.to_lk()})
+
+    def to_signal_request_bytes(self) -> bytes:
+        return _signal_request_bytes(self.type, self.to_lk())
 
     @classmethod
     def from_signal_response(cls, response: lkrtc.SignalResponse) -> SessionDescription:
         # special handling because offer and answer share the same type
-        if response.WhichOneof("message") == "offer":
+        msg = response.WhichOneof("message")
+        if msg == "offer":
             return cls.from_lk(response.offer)
-        elif response.WhichOneof("message") == "answer":
+        elif msg == "answer":
             return cls.from_lk(response.answer)
         else:
             raise ValueError(
@@ -1807,9 +1845,10 @@ class SessionDescription(LKBase):
     @classmethod
     def from_signal_request(cls, request: lkrtc.SignalRequest) -> SessionDescription:
         # special handling because offer and answer share the same type
-        if request.WhichOneof("message") == "offer":
+        msg = request.WhichOneof("message")
+        if msg == "offer":
             return cls.from_lk(request.offer)
-        elif request.WhichOneof("message") == "answer":
+        elif msg == "answer":
             return cls.from_lk(request.answer)
         else:
             raise ValueError(
@@ -1823,7 +1862,7 @@ class SessionDescription(LKBase):
         return self.type
 
 
-@dataclass
+@dataclass(slots=True)
 class DataChannelInfo:
     """
     string label = 1;
@@ -1851,7 +1890,7 @@ class DataChannelInfo:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SyncState(LKBase):
     __signal_request__ = "sync_state"
     """
@@ -1865,8 +1904,8 @@ class SyncState(LKBase):
     """
     answer: SessionDescription
     subscription: UpdateSubscription
-    publish_tracks: List[TrackPublishedResponse]
-    data_channels: List[DataChannelInfo]
+    publish_tracks: Sequence[TrackPublishedResponse]
+    data_channels: Sequence[DataChannelInfo]
     offer: SessionDescription
 
     @classmethod
@@ -1874,25 +1913,25 @@ class SyncState(LKBase):
         return cls(
             answer=SessionDescription.from_lk(state.answer),
             subscription=UpdateSubscription.from_lk(state.subscription),
-            publish_tracks=[
-                TrackPublishedResponse.from_lk(p) for p in state.publish_tracks
-            ],
-            data_channels=[DataChannelInfo.from_lk(d) for d in state.data_channels],
+            publish_tracks=tuple(
+                map(TrackPublishedResponse.from_lk, state.publish_tracks)
+            ),
+            data_channels=tuple(map(DataChannelInfo.from_lk, state.data_channels)),
             offer=SessionDescription.from_lk(state.offer),
         )
 
     def to_lk(self) -> lkrtc.SyncState:
-        return lkrtc.SyncState(
-            answer=self.answer.to_lk(),
-            subscription=self.subscription.to_lk(),
-            publish_tracks=[p.to_lk() for p in self.publish_tracks],
-            data_channels=[d.to_lk() for d in self.data_channels],
-            offer=self.offer.to_lk(),
-        )
+        pb = lkrtc.SyncState()
+        pb.answer.CopyFrom(self.answer.to_lk())
+        pb.subscription.CopyFrom(self.subscription.to_lk())
+        pb.offer.CopyFrom(self.offer.to_lk())
+        pb.publish_tracks.extend(p.to_lk() for p in self.publish_tracks)
+        pb.data_channels.extend(d.to_lk() for d in self.data_channels)
+        return pb
 
 
 # fake wrapper classes for simple messages
-@dataclass
+@dataclass(slots=True)
 class Ping(LKBase):
     __signal_request__ = "ping"
     time: Time
@@ -1907,7 +1946,7 @@ class Ping(LKBase):
         return int(self.time)
 
 
-@dataclass
+@dataclass(slots=True)
 class Pong(LKBase):
     __signal_response__ = "pong"
     time: Time
@@ -1922,7 +1961,7 @@ class Pong(LKBase):
         return int(self.time)
 
 
-@dataclass
+@dataclass(slots=True)
 class RefreshToken(LKBase):
     __signal_response__ = "refresh_token"
     token: Token
@@ -1937,33 +1976,6 @@ class RefreshToken(LKBase):
         return str(self.token)
 
 
-map_signal_response_to_class: dict[str, LKBase] = {}
-map_signal_request_to_class: dict[str, LKBase] = {}
-
-
-def init_maps() -> None:
-    global map_signal_response_to_class
-    global map_signal_request_to_class
-
-    for classname in sys.modules[__name__].__dir__():
-        klass = getattr(sys.modules[__name__], classname)
-        if hasattr(klass, "__signal_request__"):
-            if isinstance(klass.__signal_request__, List):
-                for request in klass.__signal_request__:
-                    map_signal_request_to_class[request] = klass
-            else:
-                map_signal_request_to_class[klass.__signal_request__] = klass
-        if hasattr(klass, "__signal_response__"):
-            if isinstance(klass.__signal_response__, List):
-                for response in klass.__signal_response__:
-                    map_signal_response_to_class[response] = klass
-            else:
-                map_signal_response_to_class[klass.__signal_response__] = klass
-
-
-init_maps()
-
-
 def from_signal_response(response: lkrtc.SignalResponse) -> LKBase:
     """
     Convert a SignalResponse to a LKBase subclass.
@@ -1973,7 +1985,8 @@ def from_signal_response(response: lkrtc.SignalResponse) -> LKBase:
     if lkclass is None:
         raise ValueError(f"Unknown SignalResponse message: {msg}")
 
-    return lkclass.from_signal_response(response)
+    # msg is the oneof field that is set, no need to check it again
+    return lkclass.from_lk(getattr(response, msg))
 
 
 def from_signal_request(request: lkrtc.SignalRequest) -> LKBase:
@@ -1985,4 +1998,4 @@ def from_signal_request(request: lkrtc.SignalRequest) -> LKBase:
     if lkclass is None:
         raise ValueError(f"Unknown SignalResponse message: {msg}")
 
-    return lkclass.from_signal_request(request)
+    return lkclass.from_lk(getattr(request, msg))
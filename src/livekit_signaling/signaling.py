@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import socket
 import time
 from asyncio import Task
 from dataclasses import dataclass, field
@@ -13,7 +14,7 @@ from aiortc import MediaStreamTrack, RTCSessionDescription
 from pyee.asyncio import AsyncIOEventEmitter
 
 from . import livekit_types as LK
-from .livekit_protobuf_defs import lkrtc
+from .livekit_protobuf_defs import lkrtc, protobuf_backend
 from .utils import create_access_token, wintolin
 
 # use EventHandler instead of pyee.base.Handler to make mypy happy
@@ -31,6 +32,7 @@ class SignalingEvents(AsyncIOEventEmitter):
     def __init__(self) -> None:
         super().__init__()
         self.emit_all = False
+        self.emit_unhandled = False
 
 
 @dataclass
@@ -117,6 +119,8 @@ class Signaling:
         },
     }
     paxtracker = ParticipantTracksTracker()
+    # send/receive buffer size of the websocket's TCP socket
+    socket_buffer_size = 4 << 20
 
     def __init__(
         self,
@@ -131,6 +135,9 @@ class Signaling:
         self.sent_events = SignalingEvents()
         self.received_events = SignalingEvents()
         self._emitting_requests = False
+        # single handler per received event, see register()
+        self._handlers: dict[str, EventHandler] = {}
+        self._handler_tasks: set[asyncio.Future[Any]] = set()
 
         self.host = host
         self.port = port
@@ -150,11 +157,32 @@ class Signaling:
     ) -> EventHandler | Callable[[EventHandler], EventHandler]:
         if event == "all_messages":
             self.received_events.emit_all = True
+        elif event == "unhandled_messages":
+            # only the events without a handler nor listener
+            self.received_events.emit_unhandled = True
         if handler is None:
             return self.received_events.listens_to(event)
         else:
             return self.received_events.add_listener(event, handler)
 
+    def register(
+        self, event: str, handler: EventHandler | None = None
+    ) -> EventHandler | Callable[[EventHandler], EventHandler]:
+        """
+        Register the handler of a received event.
+
+        Unlike on_recv(), an event has at most one such handler, looked up in
+        a dict and called directly instead of going through the event emitter.
+        """
+
+        def _register(handler: EventHandler) -> EventHandler:
+            self._handlers[event] = handler
+            return handler
+
+        if handler is None:
+            return _register
+        return _register(handler)
+
     def on_sent(
         self, event: str, handler: EventHandler | None = None
     ) -> EventHandler | Callable[[EventHandler], EventHandler]:
@@ -168,6 +196,7 @@ class Signaling:
 
     async def connect_and_run(self, sdk: str | None = None) -> None:
         self.logger.debug(f"connecting to {self.host}:{self.port}")
+        self.logger.debug("using the %s protobuf backend", protobuf_backend)
         secure = ["", "s"][self.port == 443]
         param_dict: Mapping[str, str] = {
             "access_token": self.token,
@@ -187,6 +216,7 @@ class Signaling:
                             url, params=param_dict
                         ) as self._ws:
                             self.logger.info(f"Connected to {url}...")
+                            self._tune_socket()
                             attempts = 0
                             wait = 0.01
                             async for msg in self._ws:
@@ -232,6 +262,24 @@ class Signaling:
 
         self.logger.error(f"Disconnected from {url}, not retrying.")
 
+    def _tune_socket(self) -> None:
+        if self._ws is None:
+            return
+        sock: socket.socket | None = self._ws.get_extra_info("socket")
+        if sock is None:
+            return
+        try:
+            # don't let Nagle's algorithm delay small signaling messages
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_SNDBUF, self.socket_buffer_size
+            )
+            sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, self.socket_buffer_size
+            )
+        except OSError as e:
+            self.logger.warning(f"Cannot set websocket socket options: {e}")
+
     async def close(self) -> None:
         if self._ws is not None:
             self.logger.info(f"Closing websocket")
@@ -251,13 +299,13 @@ class Signaling:
     async def send(self, obj: LK.LKBase, no_log: bool = False) -> bool:
         if self._ws is None:
             return False
-        lkobj = obj.to_signal_request()
+        data = obj.to_signal_request_bytes()
         if not no_log:
             self.logger.debug(f"=" * 80)
             self.logger.info(f"Signal sending: {type(obj)} {obj}")
 
         try:
-            await self._ws.send_bytes(lkobj.SerializeToString())
+            await self._ws.send_bytes(data)
         except asyncio.CancelledError:
             raise
         except Exception:
@@ -303,13 +351,15 @@ class Signaling:
             await asyncio.sleep(interval)
 
     async def send_answer(self, local_desc: RTCSessionDescription) -> bool:
-        self.logger.debug(f"Sending ANSWER:\n{wintolin(local_desc.sdp)}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Sending ANSWER:\n%s", wintolin(local_desc.sdp))
 
         answer = LK.SessionDescription(type=local_desc.type, sdp=local_desc.sdp)
         return await self.send(answer)
 
     async def send_offer(self, local_desc: RTCSessionDescription) -> bool:
-        self.logger.debug(f"Sending OFFER:\n{wintolin(local_desc.sdp)}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Sending OFFER:\n%s", wintolin(local_desc.sdp))
 
         offer = LK.SessionDescription(type=local_desc.type, sdp=local_desc.sdp)
         return await self.send(offer)
@@ -370,14 +420,15 @@ class Signaling:
         }
         """
         subreq = LK.UpdateSubscription(
-            subscribe=True, participant_tracks=[], track_sids=[]
+            subscribe=True,
+            participant_tracks=[
+                LK.ParticipantTracks(participant_sid=pax_id, track_sids=track_ids)
+                for pax_id, track_ids in pax_tracks.items()
+            ],
+            track_sids=[
+                track_id for track_ids in pax_tracks.values() for track_id in track_ids
+            ],
         )
-        for pax_id, track_ids in pax_tracks.items():
-            participant_tracks = LK.ParticipantTracks(
-                participant_sid=pax_id, track_sids=track_ids
-            )
-            subreq.participant_tracks.append(participant_tracks)
-            subreq.track_sids.extend(track_ids)
 
         self.logger.debug(f"Sending subscription request to the server")
         return await self.send(subreq)
@@ -414,6 +465,37 @@ class Signaling:
         self.logger.debug(f"Sending update track settings request to the server")
         return await self.send(req)
 
+    async def send_update_track_settings_batch(
+        self, track_settings: list[tuple[str, int, int]]
+    ) -> bool:
+        """
+        Send the settings of several tracks, given as (track_id, width, height).
+
+        UpdateTrackSettings carries a single width and height for all its
+        track_sids, so tracks are grouped by size and one request is sent per
+        distinct size instead of one per track.
+        """
+        by_size: dict[tuple[int, int], list[str]] = {}
+        for track_id, width, height in track_settings:
+            by_size.setdefault((width, height), []).append(track_id)
+
+        requests = [
+            LK.UpdateTrackSettings(
+                track_sids=track_ids,
+                disabled=False,
+                width=width,
+                height=height,
+                quality=None,
+                fps=30,
+            )
+            for (width, height), track_ids in by_size.items()
+        ]
+        self.logger.debug(
+            f"Sending {len(requests)} update track settings requests to the server"
+        )
+        results = await asyncio.gather(*(self.send(req) for req in requests))
+        return all(results)
+
     def _on_join(self, join: LK.JoinResponse) -> None:
         timeout: int = int(join.ping_timeout or 42)
         interval: int = int(join.ping_interval or timeout / 2)
@@ -439,10 +521,37 @@ class Signaling:
             self.logger.exception(f"Failed to parse input: {type(input)} {input}")
             raise
 
-        self.received_events.emit(event, output)
-
-        if self.received_events.emit_all and event != "pong":
-            self.received_events.emit("all_messages", event, output)
+        received_events = self.received_events
+        handler = self._handlers.get(event)
+        if handler is not None:
+            self._call_handler(event, handler, output)
+        # emit() tells whether the event had listeners
+        listened = received_events.emit(event, output)
+
+        if event == "pong":
+            return
+        if received_events.emit_all:
+            received_events.emit("all_messages", event, output)
+        if received_events.emit_unhandled and handler is None and not listened:
+            received_events.emit("unhandled_messages", event, output)
+
+    def _call_handler(
+        self, event: str, handler: EventHandler, output: LK.LKBase
+    ) -> None:
+        try:
+            result = handler(output)  # type: ignore[arg-type]
+        except Exception:
+            self.logger.exception(f"Handler of {event} failed")
+            return
+        if asyncio.iscoroutine(result):
+            task = asyncio.ensure_future(result)
+            self._handler_tasks.add(task)
+            task.add_done_callback(self._handler_done)
+
+    def _handler_done(self, task: asyncio.Future[Any]) -> None:
+        self._handler_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error("Handler failed", exc_info=task.exception())
 
     def _emit_request(self, input: LK.LKBase) -> None:
         try:
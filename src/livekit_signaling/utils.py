@@ -1,15 +1,33 @@
+import asyncio
 import json
 import logging
 from dataclasses import dataclass
-from typing import Callable, Optional
+from functools import lru_cache
+from typing import Callable, Dict, Optional
 
 from aiortc import MediaStreamTrack, RTCDataChannel, RTCIceCandidate, RTCPeerConnection
+from aiortc.mediastreams import MediaStreamError
 from aiortc.sdp import candidate_from_sdp, candidate_to_sdp
 from livekit import AccessToken, VideoGrant  # type: ignore
 
 from .livekit_protobuf_defs import lkrtc  # type: ignore
 
+try:
+    # optional, see the speedups extra
+    import orjson  # type: ignore
 
+    json_loads = orjson.loads
+
+    def json_dumps(obj: object) -> str:
+        return orjson.dumps(obj).decode()
+
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+
+# the same local/remote descriptions get logged more than once
+@lru_cache(maxsize=32)
 def wintolin(s: str) -> str:
     return s.replace("\r\n", "\n")
 
@@ -24,24 +42,26 @@ def create_access_token(
 
 
 def proto_to_aio_candidate(candidate: str) -> RTCIceCandidate:
-    obj = json.loads(candidate)
+    obj = json_loads(candidate)
     c = candidate_from_sdp(obj["candidate"])
     c.sdpMid = obj.get("sdpMid") or "0"
     c.sdpMLineIndex = obj.get("sdpMLineIndex")
     return c
 
 
-def aio_to_proto_candidate(candidate: RTCIceCandidate) -> lkrtc.SignalRequest:
-    sdp = candidate_to_sdp(candidate)
-
-    req = lkrtc.SignalRequest()
-    req.trickle.candidateInit = json.dumps(
+def aio_to_candidate_init(candidate: RTCIceCandidate) -> str:
+    return json_dumps(
         {
-            "sdp": sdp,
+            "sdp": candidate_to_sdp(candidate),
             "sdpMid": candidate.sdpMid,
             "sdpMLineIndex": candidate.sdpMLineIndex,
         }
     )
+
+
+def aio_to_proto_candidate(candidate: RTCIceCandidate) -> lkrtc.SignalRequest:
+    req = lkrtc.SignalRequest()
+    req.trickle.candidateInit = aio_to_candidate_init(candidate)
     return req
 
 
@@ -54,6 +74,17 @@ class PeerConnectionEvents:
     on_signalingstatechange: Callable[[], None]
     on_track: Callable[[MediaStreamTrack], None]
 
+    __slots__ = (
+        "logger",
+        "pc",
+        "on_datachannel",
+        "on_connectionstatechange",
+        "on_iceconnectionstatechange",
+        "on_icegatheringstatechange",
+        "on_signalingstatechange",
+        "on_track",
+    )
+
     def _on_datachannel(self, channel: RTCDataChannel) -> None:
         self.logger.debug(f"Data channel created {channel.label}#{channel.id}")
 
@@ -127,6 +158,50 @@ def create_pc(
     return pc
 
 
+class ReusableBlackhole:
+    """
+    A media sink that discards the frames of any number of tracks.
+
+    Unlike aiortc's MediaBlackhole, a single instance is meant to be shared by
+    all the tracks of a session: tracks can be added while it runs and released
+    one by one when they end.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[MediaStreamTrack, asyncio.Future[None]] = {}
+
+    def addTrack(self, track: MediaStreamTrack) -> None:
+        """
+        Start consuming the frames of a track.
+        """
+        if track not in self._tasks:
+            self._tasks[track] = asyncio.ensure_future(self._drain(track))
+
+    def releaseTrack(self, track: MediaStreamTrack) -> None:
+        """
+        Stop consuming the frames of a track.
+        """
+        task = self._tasks.pop(track, None)
+        if task is not None:
+            task.cancel()
+
+    async def stop(self) -> None:
+        """
+        Release all tracks.
+        """
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    @staticmethod
+    async def _drain(track: MediaStreamTrack) -> None:
+        try:
+            while True:
+                await track.recv()
+        except MediaStreamError:
+            pass
+
+
 def get_track_ids(track: MediaStreamTrack) -> tuple[Optional[str], Optional[str]]:
     # FIXME: return the track_id once, we should not need the pax_id
     return track.id, track.id
@@ -0,0 +1,143 @@
+import json
+
+import pytest
+from aiortc.sdp import candidate_from_sdp
+
+import livekit_signaling.livekit_types as LK
+from livekit_signaling.livekit_protobuf_defs import lkrtc
+from livekit_signaling.utils import aio_to_candidate_init
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        LK.Ping(time=LK.Time(1)),
+        LK.Ping(time=LK.Time(1_700_000_000_000)),
+        LK.SessionDescription(type="offer", sdp="v=0\r\n"),
+        LK.SessionDescription(type="answer", sdp="v=0\r\n"),
+        LK.UpdateSubscription(
+            track_sids=[],
+            subscribe=True,
+            participant_tracks=[
+                LK.ParticipantTracks(
+                    participant_sid=LK.ParticipantId("PA_1"),
+                    track_sids=[LK.TrackId("TR_1"), LK.TrackId("TR_2")],
+                ),
+            ],
+        ),
+        LK.UpdateTrackSettings(
+            track_sids=["TR_1"],
+            disabled=False,
+            quality=LK.VideoQuality.HIGH,
+            width=1280,
+            height=720,
+            fps=30,
+        ),
+    ],
+)
+def test_signal_request_bytes(obj: LK.LKBase) -> None:
+    assert obj.to_signal_request_bytes() == obj.to_signal_request().SerializeToString()
+
+
+CANDIDATE_SDP = "842163049 1 udp 1677729535 203.0.113.7 50000 typ srflx"
+CANDIDATE_INIT = json.dumps(
+    {"candidate": CANDIDATE_SDP, "sdpMid": "0", "sdpMLineIndex": 0}
+)
+
+
+def test_trickle_request_parses_candidate_lazily() -> None:
+    pb = lkrtc.TrickleRequest(
+        candidateInit=CANDIDATE_INIT, target=lkrtc.SignalTarget.SUBSCRIBER
+    )
+    req = LK.TrickleRequest.from_lk(pb)
+    assert req.candidateInit == CANDIDATE_INIT
+    assert req.target is LK.SignalTarget.SUBSCRIBER
+    assert req._candidate is None
+
+    candidate = req.candidate
+    assert candidate.ip == "203.0.113.7"
+    assert candidate.port == 50000
+    assert candidate.sdpMid == "0"
+    # parsed once, then cached
+    assert req.candidate is candidate
+
+
+def test_trickle_request_candidate_init_is_keyword_only() -> None:
+    target = LK.SignalTarget.SUBSCRIBER
+    with pytest.raises(TypeError):
+        LK.TrickleRequest(None, target, CANDIDATE_INIT)  # type: ignore[misc]
+    with pytest.raises(TypeError):
+        LK.TrickleRequest(None, target)
+    req = LK.TrickleRequest(None, target, candidateInit=CANDIDATE_INIT)
+    assert req.candidateInit == CANDIDATE_INIT
+
+
+def test_trickle_request_from_candidate_round_trip() -> None:
+    candidate = candidate_from_sdp(CANDIDATE_SDP)
+    candidate.sdpMid = "0"
+    candidate.sdpMLineIndex = 0
+    target = LK.SignalTarget.PUBLISHER
+
+    req = LK.TrickleRequest.from_candidate(candidate, target)
+    assert req.candidate is candidate
+    assert req.candidateInit == aio_to_candidate_init(candidate)
+    assert req == LK.TrickleRequest(candidate, target)
+
+    received = LK.TrickleRequest.from_lk(req.to_lk())
+    assert received == req
+    assert received.target is target
+
+
+LK_ENUMS = LK.LKEnum.__subclasses__()
+
+
+@pytest.mark.parametrize("enum_cls", LK_ENUMS, ids=lambda cls: cls.__name__)
+def test_lk_enum_maps_both_ways(enum_cls: type[LK.LKEnum]) -> None:
+    assert enum_cls._FROM_LK
+    for pb, member in enum_cls._FROM_LK.items():
+        assert enum_cls.from_lk(pb) is member
+        assert member.to_lk() == pb
+    mapped = set(enum_cls._FROM_LK.values())
+    for member in enum_cls:
+        if member not in mapped:
+            with pytest.raises(ValueError):
+                member.to_lk()
+
+
+@pytest.mark.parametrize("enum_cls", LK_ENUMS, ids=lambda cls: cls.__name__)
+def test_lk_enum_rejects_unknown_values(enum_cls: type[LK.LKEnum]) -> None:
+    with pytest.raises(ValueError):
+        enum_cls.from_lk(max(enum_cls._FROM_LK) + 1)
+
+
+LK_WRAPPERS = [
+    cls
+    for cls in vars(LK).values()
+    if isinstance(cls, type) and issubclass(cls, LK.LKBase) and cls is not LK.LKBase
+]
+
+
+def _signal_names(names: str | list[str] | None) -> list[str]:
+    if names is None:
+        return []
+    return [names] if isinstance(names, str) else names
+
+
+@pytest.mark.parametrize("cls", LK_WRAPPERS, ids=lambda cls: cls.__name__)
+def test_signal_registry_resolves_wrapper(cls: type[LK.LKBase]) -> None:
+    # the registered class must be the final slotted dataclass, not the
+    # class dataclass() replaced
+    for name in _signal_names(getattr(cls, "__signal_request__", None)):
+        assert LK.map_signal_request_to_class[name] is cls
+        assert name in lkrtc.SignalRequest.DESCRIPTOR.fields_by_name
+    for name in _signal_names(getattr(cls, "__signal_response__", None)):
+        assert LK.map_signal_response_to_class[name] is cls
+        assert name in lkrtc.SignalResponse.DESCRIPTOR.fields_by_name
+
+
+def test_signal_registry_only_holds_wrappers() -> None:
+    wrappers = set(LK_WRAPPERS)
+    assert LK.map_signal_request_to_class
+    assert LK.map_signal_response_to_class
+    assert set(LK.map_signal_request_to_class.values()) <= wrappers
+    assert set(LK.map_signal_response_to_class.values()) <= wrappers